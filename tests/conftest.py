@@ -0,0 +1,35 @@
+"""Shared fixtures for the tool tests
+
+The tools are standalone scripts, most without a .py suffix, so they are
+loaded by path rather than imported as a package. tools/ goes on sys.path
+so the scripts can import sx_common the way they do when installed.
+"""
+
+import importlib.machinery
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+TOOLS = Path(__file__).resolve().parent.parent / "tools"
+sys.path.insert(0, str(TOOLS))
+
+_loaded = {}
+
+def load_tool(name):
+    """Import tools/<name> as a module, once per test session"""
+    if name not in _loaded:
+        module_name = "sx_tool_" + name.replace("/", "_").replace("-", "_").removesuffix(".py")
+        loader = importlib.machinery.SourceFileLoader(module_name, str(TOOLS / name))
+        spec = importlib.util.spec_from_loader(module_name, loader)
+        module = importlib.util.module_from_spec(spec)
+        # dataclasses resolve their module through sys.modules while executing
+        sys.modules[module_name] = module
+        loader.exec_module(module)
+        _loaded[name] = module
+    return _loaded[name]
+
+@pytest.fixture
+def tool():
+    return load_tool
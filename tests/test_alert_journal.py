@@ -0,0 +1,50 @@
+"""AlertJournal recovery from a torn final write"""
+
+import pytest
+
+@pytest.fixture
+def journal_factory(tool, tmp_path):
+    health = tool("sx-health-monitor")
+    
+    def make():
+        return health.AlertJournal(state_file=str(tmp_path / "state"),
+                                   journal_file=str(tmp_path / "state.journal"))
+    return make
+
+def test_torn_tail_is_truncated_before_appending(journal_factory, tmp_path):
+    journal = journal_factory()
+    journal.append('raise', 'memory', alert={'message': "Memory high"})
+    journal.close()
+    
+    # Crash in the middle of the second write
+    with open(tmp_path / "state.journal", 'ab') as f:
+        f.write(b'{"seq":2,"op":"resolve","ke')
+    
+    journal = journal_factory()
+    state, records = journal.load()
+    assert [r['seq'] for r in records] == [1]
+    journal.append('resolve', 'memory')
+    journal.append('raise', 'disk:/', alert={'message': "Disk high"})
+    journal.close()
+    
+    state, records = journal_factory().load()
+    assert [(r['seq'], r['op'], r['key']) for r in records] == [
+        (1, 'raise', 'memory'), (2, 'resolve', 'memory'), (3, 'raise', 'disk:/')]
+
+def test_complete_record_without_newline_is_dropped(journal_factory, tmp_path):
+    (tmp_path / "state.journal").write_bytes(
+        b'{"seq":1,"op":"raise","key":"a"}\n{"seq":2,"op":"raise","key":"b"}')
+    journal = journal_factory()
+    assert [r['key'] for r in journal.load()[1]] == ['a']
+    assert (tmp_path / "state.journal").read_bytes() == b'{"seq":1,"op":"raise","key":"a"}\n'
+
+def test_checkpoint_then_journal(journal_factory):
+    journal = journal_factory()
+    journal.append('raise', 'cpu', alert={'message': "CPU hot"})
+    journal.checkpoint({'active': ['cpu']})
+    journal.append('resolve', 'cpu')
+    journal.close()
+    
+    state, records = journal_factory().load()
+    assert state == {'active': ['cpu'], 'seq': 1}
+    assert [(r['seq'], r['op']) for r in records] == [(2, 'resolve')]
@@ -0,0 +1,56 @@
+"""sx-test benchmark baselines and the uncached file I/O benchmark"""
+
+import json
+
+import pytest
+
+@pytest.fixture
+def sxtest(tool):
+    return tool("sx-test")
+
+class FakeBenchmark:
+    warmup, repetitions, scale = 0, 1, 1.0
+    
+    def __init__(self, sxtest, median):
+        self.sxtest = sxtest
+        self.median = median
+    
+    def run(self, progress=None):
+        return {'fsync_latency': {'description': "fsync", 'unit': "ms", 'median': self.median,
+                                  'p99': self.median, 'higher_is_better': False}}
+    
+    def compare(self, baseline, current, threshold):
+        return self.sxtest.PerformanceBenchmark.compare(baseline, current, threshold)
+
+def bare_tester(sxtest, tmp_path):
+    t = sxtest.SentinelXTester.__new__(sxtest.SentinelXTester)
+    t.report_dir = tmp_path
+    return t
+
+def test_save_and_compare_same_file_uses_previous_baseline(sxtest, tmp_path):
+    baseline = tmp_path / "baseline.json"
+    t = bare_tester(sxtest, tmp_path)
+    assert t.run_benchmarks(FakeBenchmark(sxtest, 1.0), save=str(baseline)) == 0
+    
+    # Twice as slow: must regress against the stored 1.0, not against itself
+    code = t.run_benchmarks(FakeBenchmark(sxtest, 2.0), save=str(baseline), baseline=str(baseline))
+    assert code == sxtest.EXIT_REGRESSION
+    assert json.loads(baseline.read_text())['results']['fsync_latency']['median'] == 2.0
+
+def test_unreadable_baseline_fails_before_saving(sxtest, tmp_path):
+    t = bare_tester(sxtest, tmp_path)
+    missing, save = tmp_path / "missing.json", tmp_path / "new.json"
+    assert t.run_benchmarks(FakeBenchmark(sxtest, 1.0), save=str(save), baseline=str(missing)) == 1
+    assert not save.exists()
+
+def test_file_io_evicts_blocks_before_reading(sxtest, tmp_path, monkeypatch):
+    advice = []
+    monkeypatch.setattr(sxtest.os, "posix_fadvise",
+                        lambda fd, offset, length, how: advice.append((offset, length, how)))
+    bench = sxtest.PerformanceBenchmark(tmp_path, warmup=0, repetitions=1, scale=1 / 16)
+    samples = bench.bench_file_io(5)
+    assert len(samples) == 5
+    assert advice[0] == (0, 0, sxtest.os.POSIX_FADV_RANDOM)
+    dropped = [a for a in advice[1:] if a[2] == sxtest.os.POSIX_FADV_DONTNEED]
+    assert len(dropped) == 5 and all(length == 4096 for _, length, _ in dropped)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,105 @@
+"""CgroupAccounting against a synthetic cgroup v2 tree"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import sx_common
+from sx_common import CgroupAccounting
+
+def write_unit(root, cgroup, usage, memory=None, io=None):
+    path = root / cgroup
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "cpu.stat").write_text(f"usage_usec {usage}\nuser_usec {usage // 2}\nsystem_usec {usage // 2}\n")
+    if memory is not None:
+        (path / "memory.current").write_text(f"{memory}\n")
+    if io is not None:
+        (path / "io.stat").write_text("".join(
+            f"{device} rbytes={rbytes} wbytes={wbytes} rios=1 wios=1 dbytes=0 dios=0\n"
+            for device, (rbytes, wbytes) in io.items()))
+
+@pytest.fixture
+def cgroupfs(tmp_path):
+    root = tmp_path / "cgroup"
+    root.mkdir()
+    (root / "cgroup.controllers").write_text("cpu io memory pids\n")
+    write_unit(root, "init.scope", 1_000_000, memory=8 << 20)
+    write_unit(root, "system.slice/sshd.service", 2_000_000, memory=4 << 20,
+               io={"8:0": (1000, 2000), "259:0": (500, 0)})
+    write_unit(root, "system.slice/docker-0123abcd.scope", 5_000_000, memory=64 << 20,
+               io={"8:0": (0, 10_000)})
+    write_unit(root, "user.slice/user-1000.slice/session-2.scope", 300_000)
+    # The unit's own files account its children; the walk must stop at it
+    write_unit(root, "user.slice/user-1000.slice/user@1000.service", 700_000, memory=16 << 20)
+    write_unit(root, "user.slice/user-1000.slice/user@1000.service/app.slice/editor.service", 600_000)
+    # A slice on its own is not a unit
+    (root / "system.slice/cpu.stat").write_text("usage_usec 99999999\n")
+    return root
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(sx_common, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+def by_cgroup(samples):
+    return {sample['cgroup']: sample for sample in samples}
+
+def test_units_stop_at_service_and_scope(cgroupfs, clock):
+    samples = by_cgroup(CgroupAccounting(str(cgroupfs)).sample())
+    assert sorted(samples) == [
+        "init.scope",
+        "system.slice/docker-0123abcd.scope",
+        "system.slice/sshd.service",
+        "user.slice/user-1000.slice/session-2.scope",
+        "user.slice/user-1000.slice/user@1000.service",
+    ]
+    assert samples["user.slice/user-1000.slice/user@1000.service"]['unit'] == "user@1000.service"
+    assert samples["system.slice/sshd.service"]['memory_bytes'] == 4 << 20
+    # No memory controller enabled: zero rather than a missing key
+    assert samples["user.slice/user-1000.slice/session-2.scope"]['memory_bytes'] == 0
+    # The first sample has nothing to compute rates against
+    assert all(s['cpu_percent'] == 0.0 and s['io_read_bytes_per_sec'] == 0.0 for s in samples.values())
+
+def test_second_sample_reports_rates(cgroupfs, clock):
+    accounting = CgroupAccounting(str(cgroupfs))
+    accounting.sample()
+    
+    clock.now += 2.0
+    # sshd: 1 s of CPU in 2 s, 3000 B read and 4000 B written over both devices
+    write_unit(cgroupfs, "system.slice/sshd.service", 3_000_000, memory=5 << 20,
+               io={"8:0": (3000, 6000), "259:0": (1500, 0)})
+    # docker: restarted, so its counters went backwards
+    write_unit(cgroupfs, "system.slice/docker-0123abcd.scope", 400_000, memory=32 << 20,
+               io={"8:0": (0, 0)})
+    # A unit that appears between samples has no rates yet
+    write_unit(cgroupfs, "system.slice/cron.service", 9_000_000)
+    
+    samples = by_cgroup(accounting.sample())
+    sshd = samples["system.slice/sshd.service"]
+    assert sshd['cpu_percent'] == pytest.approx(50.0)
+    assert sshd['io_read_bytes_per_sec'] == pytest.approx(1500.0)
+    assert sshd['io_write_bytes_per_sec'] == pytest.approx(2000.0)
+    assert sshd['memory_bytes'] == 5 << 20
+    
+    docker = samples["system.slice/docker-0123abcd.scope"]
+    assert docker['cpu_percent'] == 0.0
+    assert docker['io_write_bytes_per_sec'] == 0.0
+    assert docker['memory_bytes'] == 32 << 20
+    
+    assert samples["system.slice/cron.service"]['cpu_percent'] == 0.0
+    assert samples["init.scope"]['cpu_percent'] == 0.0
+    
+    assert [s['unit'] for s in accounting.top('memory_bytes', 2)] == ["docker-0123abcd.scope",
+                                                                     "user@1000.service"]
+    assert accounting.top('cpu_percent', 1)[0]['unit'] == "sshd.service"
+
+def test_stopped_units_and_v1_hierarchy(cgroupfs, clock):
+    (cgroupfs / "system.slice/sshd.service/cpu.stat").unlink()
+    samples = by_cgroup(CgroupAccounting(str(cgroupfs)).sample())
+    assert "system.slice/sshd.service" not in samples
+    
+    (cgroupfs / "cgroup.controllers").unlink()
+    accounting = CgroupAccounting(str(cgroupfs))
+    assert not accounting.available
+    assert accounting.sample() == []
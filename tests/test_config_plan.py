@@ -0,0 +1,111 @@
+"""sx-config plan/apply against a fake root filesystem"""
+
+import json
+import os
+
+import pytest
+
+@pytest.fixture
+def sxconfig(tool):
+    return tool("sx-config")
+
+def stub(path, body):
+    path.write_text("#!/bin/sh\n" + body)
+    path.chmod(0o755)
+    return str(path)
+
+@pytest.fixture
+def root(tmp_path):
+    """A live system that differs from the default config in every setting"""
+    root = tmp_path / "root"
+    for zone in ("UTC", "Europe/Berlin"):
+        (root / "usr/share/zoneinfo" / zone).parent.mkdir(parents=True, exist_ok=True)
+        (root / "usr/share/zoneinfo" / zone).write_text("TZif")
+    (root / "etc").mkdir()
+    (root / "etc/hostname").write_text("oldhost\n")
+    os.symlink("../usr/share/zoneinfo/Europe/Berlin", root / "etc/localtime")
+    (root / "etc/locale.conf").write_text('LANG="C.UTF-8"\n')
+    for cpu in ("cpu0", "cpu1"):
+        (root / "sys/devices/system/cpu" / cpu / "cpufreq").mkdir(parents=True)
+        (root / "sys/devices/system/cpu" / cpu / "cpufreq/scaling_governor").write_text("powersave\n")
+    (root / "proc/sys/vm").mkdir(parents=True)
+    (root / "proc/sys/vm/swappiness").write_text("60\n")
+    return root
+
+@pytest.fixture
+def systemctl(tmp_path):
+    # `enable --now UNIT` marks the unit; `show` reports marked units as
+    # enabled/active and the rest as disabled/inactive
+    units = tmp_path / "units"
+    units.mkdir()
+    return stub(tmp_path / "systemctl", f"""
+if [ "$1" = enable ]; then touch "{units}/$3"; exit 0; fi
+shift 2
+for unit in "$@"; do
+    if [ -e "{units}/$unit" ]; then file=enabled active=active; else file=disabled active=inactive; fi
+    printf 'Id=%s\\nUnitFileState=%s\\nActiveState=%s\\n\\n' "$unit" "$file" "$active"
+done
+""")
+
+@pytest.fixture(autouse=True)
+def live_tools(tmp_path, monkeypatch):
+    """hostnamectl/timedatectl stand-ins that record being called"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name in ("hostnamectl", "timedatectl"):
+        stub(bin_dir / name, f'echo "$@" >> "{tmp_path}/live-calls"\nexit 1\n')
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return tmp_path / "live-calls"
+
+def test_plan_lists_every_difference(sxconfig, root, systemctl):
+    config = sxconfig.SentinelXConfig(root, systemctl)
+    steps = {step.key: step for step in config.plan()}
+    assert sorted(steps) == [
+        'performance.cpu_governor', 'performance.swappiness',
+        'security.apparmor.enabled', 'security.firewall.enabled',
+        'system.hostname', 'system.locale', 'system.timezone',
+    ]
+    assert (steps['system.hostname'].current, steps['system.hostname'].desired) == ("oldhost", "sentinelx")
+    assert steps['system.timezone'].current == "Europe/Berlin"
+    assert steps['performance.swappiness'].current == 60
+    assert steps['security.firewall.enabled'].current == "disabled/inactive"
+
+def test_apply_converges_below_root(sxconfig, root, systemctl, live_tools):
+    config = sxconfig.SentinelXConfig(root, systemctl)
+    results = config.apply()
+    assert [r for r in results if r['status'] != 'changed'] == []
+    assert not live_tools.exists()
+    
+    assert (root / "etc/hostname").read_text() == "sentinelx\n"
+    assert os.readlink(root / "etc/localtime") == "../usr/share/zoneinfo/UTC"
+    assert (root / "etc/locale.conf").read_text() == "LANG=en_US.UTF-8\n"
+    assert (root / "proc/sys/vm/swappiness").read_text() == "10\n"
+    for cpu in ("cpu0", "cpu1"):
+        assert (root / "sys/devices/system/cpu" / cpu / "cpufreq/scaling_governor").read_text() == "schedutil"
+    assert config.plan() == []
+
+def test_unknown_timezone_fails_its_step(sxconfig, root, systemctl):
+    config = sxconfig.SentinelXConfig(root, systemctl)
+    config.set('system.timezone', 'Mars/Olympus_Mons')
+    results = {r['key']: r for r in config.apply(sections=['system'])}
+    assert results['system.timezone']['status'] == 'failed'
+    assert "Unknown timezone" in results['system.timezone']['error']
+    assert results['system.hostname']['status'] == 'changed'
+    assert os.readlink(root / "etc/localtime") == "../usr/share/zoneinfo/Europe/Berlin"
+
+def test_non_numeric_swappiness_is_a_failed_step(sxconfig, root, systemctl, capsys):
+    config = sxconfig.SentinelXConfig(root, systemctl)
+    config.set('performance.swappiness', 'low')
+    steps = {step.key: step for step in config.plan()}
+    assert steps['performance.swappiness'].desired == 'low'
+    
+    results = {r['key']: r for r in config.apply(sections=['performance'])}
+    assert results['performance.swappiness']['status'] == 'failed'
+    assert "integer" in results['performance.swappiness']['error']
+    assert results['performance.cpu_governor']['status'] == 'changed'
+    assert (root / "proc/sys/vm/swappiness").read_text() == "60\n"
+    
+    capsys.readouterr()
+    config.show_plan(as_json=True)
+    planned = {step['key']: step for step in json.loads(capsys.readouterr().out)}
+    assert planned['performance.swappiness']['desired'] == 'low'
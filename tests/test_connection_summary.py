@@ -0,0 +1,123 @@
+"""ConnectionSummary over fixture sockstat files and a fake sock_diag socket"""
+
+import socket
+import struct
+from types import SimpleNamespace
+
+import pytest
+
+import sx_common
+from sx_common import ConnectionSummary
+
+SOCKSTAT = """\
+sockets: used 412
+TCP: inuse 23 orphan 2 tw 7 alloc 30 mem 5
+UDP: inuse 6 mem 2
+UDPLITE: inuse 0
+RAW: inuse 1
+FRAG: inuse 0 memory 0
+"""
+
+SOCKSTAT6 = """\
+TCP6: inuse 4
+UDP6: inuse 3
+UDPLITE6: inuse 1
+RAW6: inuse 2
+FRAG6: inuse 0 memory 0
+"""
+
+TCP = """\
+  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode
+   0: 00000000:0016 00000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 1 1 0000000000000000 100 0 0 10 0
+   1: 0100007F:1F90 0100007F:A2B4 01 00000000:00000000 00:00000000 00000000  1000        0 2 1 0000000000000000 20 4 30 10 -1
+   2: 0100007F:A2B4 0100007F:1F90 01 00000000:00000000 00:00000000 00000000  1000        0 3 1 0000000000000000 20 4 30 10 -1
+   3: 0100007F:A2B6 0100007F:1F90 06 00000000:00000000 03:00000F00 00000000     0        0 0 3 0000000000000000
+"""
+
+TCP6 = """\
+  sl  local_address                         remote_address                        st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode
+   0: 00000000000000000000000000000000:0016 00000000000000000000000000000000:0000 0A 00000000:00000000 00:00000000 00000000     0        0 4 1 0000000000000000 100 0 0 10 0
+   1: 00000000000000000000000001000000:0050 00000000000000000000000001000000:C350 08 00000000:00000000 00:00000000 00000000     0        0 5 1 0000000000000000 20 4 30 10 -1
+"""
+
+@pytest.fixture
+def proc_net(tmp_path):
+    for name, text in (("sockstat", SOCKSTAT), ("sockstat6", SOCKSTAT6),
+                       ("tcp", TCP), ("tcp6", TCP6)):
+        (tmp_path / name).write_text(text)
+    return tmp_path
+
+def diag_msg(state):
+    """One SOCK_DIAG_BY_FAMILY reply: nlmsghdr plus an inet_diag_msg"""
+    body = struct.pack('=BBBB', socket.AF_INET, state, 0, 0) + bytes(68)
+    return struct.pack('=LHHLL', 16 + len(body), ConnectionSummary.SOCK_DIAG_BY_FAMILY, 2, 1, 0) + body
+
+def nlmsg(msg_type):
+    return struct.pack('=LHHLL', 20, msg_type, 0, 1, 0) + bytes(4)
+
+@pytest.fixture
+def netlink(monkeypatch):
+    """Replace sx_common's socket module; replies[family] lists the recv() chunks"""
+    replies = {}
+    
+    class FakeSocket:
+        def __init__(self, family, kind, protocol):
+            assert (family, protocol) == (socket.AF_NETLINK, ConnectionSummary.NETLINK_SOCK_DIAG)
+            if replies.get('unavailable'):
+                raise PermissionError("netlink not permitted")
+            self.chunks = None
+        
+        def __enter__(self):
+            return self
+        
+        def __exit__(self, *exc):
+            return False
+        
+        def send(self, request):
+            assert len(request) == 72 == struct.unpack_from('=L', request)[0]
+            self.chunks = list(replies[request[16]])
+        
+        def recv(self, size):
+            return self.chunks.pop(0)
+    
+    monkeypatch.setattr(sx_common, "socket", SimpleNamespace(
+        socket=FakeSocket, AF_NETLINK=socket.AF_NETLINK, SOCK_DGRAM=socket.SOCK_DGRAM,
+        AF_INET=socket.AF_INET, AF_INET6=socket.AF_INET6, IPPROTO_TCP=socket.IPPROTO_TCP))
+    return replies
+
+def test_protocol_totals(proc_net):
+    summary = ConnectionSummary(str(proc_net)).collect(states=False)
+    assert summary == {
+        'tcp': 27, 'tcp_time_wait': 7, 'tcp_orphan': 2,
+        'udp': 10, 'raw': 3, 'sockets_used': 412, 'total': 44,
+    }
+
+def test_missing_sockstat6(proc_net):
+    (proc_net / "sockstat6").unlink()
+    summary = ConnectionSummary(str(proc_net)).collect(states=False)
+    assert (summary['tcp'], summary['udp'], summary['raw']) == (23, 6, 1)
+    assert ConnectionSummary(str(proc_net / "absent")).collect(states=False)['total'] == 0
+
+def test_states_from_sock_diag(proc_net, netlink):
+    netlink[socket.AF_INET] = [
+        diag_msg(1) + diag_msg(1) + diag_msg(10),
+        diag_msg(6) + diag_msg(12) + nlmsg(ConnectionSummary.NLMSG_DONE),
+    ]
+    netlink[socket.AF_INET6] = [diag_msg(10) + diag_msg(8) + nlmsg(ConnectionSummary.NLMSG_DONE)]
+    assert ConnectionSummary(str(proc_net)).tcp_states() == {
+        'ESTABLISHED': 2, 'LISTEN': 2, 'TIME_WAIT': 1, 'CLOSE_WAIT': 1, 'NEW_SYN_RECV': 1,
+    }
+
+def test_proc_fallback_without_netlink(proc_net, netlink):
+    netlink['unavailable'] = True
+    expected = {'LISTEN': 2, 'ESTABLISHED': 2, 'TIME_WAIT': 1, 'CLOSE_WAIT': 1}
+    assert ConnectionSummary(str(proc_net)).tcp_states() == expected
+    assert ConnectionSummary(str(proc_net)).collect()['tcp_states'] == expected
+
+def test_failed_dump_discards_partial_counts(proc_net, netlink):
+    # IPv4 answers, IPv6 errors: only the /proc counts must remain
+    netlink[socket.AF_INET] = [diag_msg(1) * 50 + nlmsg(ConnectionSummary.NLMSG_DONE)]
+    netlink[socket.AF_INET6] = [nlmsg(ConnectionSummary.NLMSG_ERROR)]
+    assert ConnectionSummary(str(proc_net)).tcp_states() == {
+        'LISTEN': 2, 'ESTABLISHED': 2, 'TIME_WAIT': 1, 'CLOSE_WAIT': 1,
+    }
@@ -0,0 +1,83 @@
+"""CpuSampler delta math over synthetic /proc/stat contents"""
+
+import pytest
+
+@pytest.fixture
+def monitor(tool):
+    return tool("python/sx-monitor.py")
+
+def stat_line(name, user, system, idle, iowait=0, guest=0):
+    # user nice system idle iowait irq softirq steal guest guest_nice
+    return f"{name} {user} 0 {system} {idle} {iowait} 0 0 0 {guest} 0\n"
+
+@pytest.fixture
+def proc_stat(tmp_path):
+    path = tmp_path / "stat"
+    
+    def write(*cores):
+        """cores: (user, system, idle[, iowait]) per CPU; the aggregate is their sum"""
+        total = [sum(values) for values in zip(*[core + (0,) * (4 - len(core)) for core in cores])]
+        text = stat_line("cpu", total[0], total[1], total[2], total[3], guest=999)
+        text += "".join(stat_line(f"cpu{i}", *core) for i, core in enumerate(cores))
+        text += "intr 12345 0 0\nctxt 67890\n"
+        path.write_text(text)
+    
+    return path, write
+
+def test_first_sample_measures_since_boot(monitor, proc_stat):
+    path, write = proc_stat
+    write((300, 100, 600), (100, 0, 900))
+    total, cores = monitor.CpuSampler(str(path)).sample()
+    assert cores == [40.0, 10.0]
+    assert total == 25.0
+
+def test_deltas_between_samples(monitor, proc_stat):
+    path, write = proc_stat
+    sampler = monitor.CpuSampler(str(path))
+    write((300, 100, 600), (100, 0, 900))
+    sampler.sample()
+    # cpu0: 75 busy of 100; cpu1: 0 busy of 100, iowait counts as idle
+    write((350, 125, 625), (100, 0, 950, 50))
+    total, cores = sampler.sample()
+    assert cores == [75.0, 0.0]
+    assert total == 37.5
+    # Guest time is already part of user time and is not counted twice
+    assert total <= 100.0
+
+def test_zero_length_interval(monitor, proc_stat):
+    path, write = proc_stat
+    sampler = monitor.CpuSampler(str(path))
+    write((300, 100, 600), (100, 0, 900))
+    sampler.sample()
+    assert sampler.sample() == (0.0, [0.0, 0.0])
+
+def test_counters_going_backwards_are_clamped(monitor, proc_stat):
+    path, write = proc_stat
+    sampler = monitor.CpuSampler(str(path))
+    write((300, 100, 600), (100, 0, 900))
+    sampler.sample()
+    # cpu1 went offline and back online: its counters restarted
+    write((400, 100, 700), (5, 0, 10))
+    total, cores = sampler.sample()
+    assert cores == [50.0, 0.0]
+    assert 0.0 <= total <= 100.0
+    # Busy time shrinking while idle grows is clamped, not negative
+    write((350, 100, 900), (5, 0, 20))
+    assert sampler.sample()[1] == [0.0, 0.0]
+
+def test_hotplug_changes_the_core_count(monitor, proc_stat):
+    path, write = proc_stat
+    sampler = monitor.CpuSampler(str(path))
+    write((300, 100, 600), (100, 0, 900))
+    sampler.sample()
+    write((300, 100, 600), (100, 0, 900), (50, 50, 100))
+    total, cores = sampler.sample()
+    # A different set of CPUs cannot be diffed: fall back to since-boot
+    assert cores == [40.0, 10.0, 50.0]
+    assert total == pytest.approx(100 * 600 / 2200, abs=0.05)
+
+def test_unreadable_stat(monitor, tmp_path):
+    with pytest.raises(OSError):
+        monitor.CpuSampler(str(tmp_path / "missing")).sample()
+    (tmp_path / "empty").write_text("")
+    assert monitor.CpuSampler(str(tmp_path / "empty")).sample() == (0.0, [])
@@ -0,0 +1,104 @@
+"""DiskInventory mount filtering and probe bookkeeping"""
+
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import pytest
+
+from sx_common import DiskInventory
+
+@pytest.fixture
+def mountinfo(tmp_path):
+    for name in ("root", "tank", "home", "container", "proc", "run", "snap", "share"):
+        (tmp_path / name).mkdir()
+    
+    def write(*skip):
+        lines = {
+            "root": f"21 1 8:1 / {tmp_path}/root rw shared:1 - ext4 /dev/sda1 rw",
+            "tank": f"22 1 0:40 / {tmp_path}/tank rw shared:2 - zfs tank/data rw,xattr",
+            "home": f"23 1 0:41 /@home {tmp_path}/home rw shared:3 - btrfs rpool rw",
+            "container": f"24 1 0:42 / {tmp_path}/container rw - overlay overlay rw,lowerdir=/l",
+            "proc": f"25 1 0:5 / {tmp_path}/proc rw - proc proc rw",
+            "run": f"26 1 0:24 / {tmp_path}/run rw - tmpfs tmpfs rw",
+            "snap": f"27 1 7:0 / {tmp_path}/snap ro - squashfs /dev/loop0 ro",
+            "share": f"28 1 0:50 / {tmp_path}/share rw - nfs4 srv:/export rw",
+            "bind": f"29 1 8:1 /srv {tmp_path}/tank/bind rw - ext4 /dev/sda1 rw",
+            "cgroup": "30 1 0:26 / /sys/fs/cgroup rw - cgroup2 cgroup2 rw",
+        }
+        path = tmp_path / "mountinfo"
+        path.write_text("".join(line + "\n" for name, line in lines.items() if name not in skip))
+        return path
+    
+    return tmp_path, write
+
+def test_filters_by_fstype_not_source(mountinfo):
+    root, write = mountinfo
+    inventory = DiskInventory(str(write()))
+    mounts = {os.path.basename(m['mountpoint']): m for m in inventory.mounts()}
+    # ZFS datasets, btrfs subvolumes, overlay roots and shares stay in;
+    # pseudo filesystems, loop images and the bind mount of sda1 are out
+    assert sorted(mounts) == ["container", "home", "root", "share", "tank"]
+    assert mounts["root"]["disk"] == "sda1"
+    assert mounts["tank"]["device"] == "tank/data"
+    assert mounts["tank"]["disk"] is None
+
+def test_usage_and_pruning_of_vanished_mounts(mountinfo):
+    root, write = mountinfo
+    inventory = DiskInventory(str(write()))
+    usage = inventory.usage()
+    assert set(usage) == {str(root / name) for name in ("root", "tank", "home", "container", "share")}
+    assert all(not entry['stale'] and entry['total'] > 0 for entry in usage.values())
+    # A share whose statvfs hangs keeps its probe pending...
+    hung = Future()
+    inventory._pending[str(root / "share")] = hung
+    assert inventory.usage()[str(root / "share")]['stale']
+    
+    # ...until it is unmounted
+    write("share", "tank")
+    inventory.invalidate()
+    usage = inventory.usage()
+    assert str(root / "share") not in usage
+    assert str(root / "share") not in inventory._pending
+    assert str(root / "tank") not in inventory._usage
+
+def test_hung_mounts_do_not_starve_healthy_ones(tmp_path, monkeypatch):
+    names = [f"nfs{i}" for i in range(6)] + ["root"]
+    lines = []
+    for i, name in enumerate(names):
+        (tmp_path / name).mkdir()
+        lines.append(f"{40 + i} 1 0:{60 + i} / {tmp_path}/{name} rw - "
+                     + ("ext4 /dev/sda1" if name == "root" else f"nfs4 srv:/{name}") + " rw")
+    (tmp_path / "mountinfo").write_text("\n".join(lines) + "\n")
+    
+    # statvfs on the six shares blocks until the test ends, like a dead server
+    release = threading.Event()
+    calls = Counter()
+    real_statvfs = os.statvfs
+    
+    def statvfs(path):
+        calls[os.path.basename(path)] += 1
+        if "nfs" in path:
+            release.wait()
+        return real_statvfs(path)
+    
+    monkeypatch.setattr(os, "statvfs", statvfs)
+    inventory = DiskInventory(str(tmp_path / "mountinfo"), timeout=0.2, workers=4)
+    try:
+        for _ in range(3):
+            usage = inventory.usage()
+            root = usage[str(tmp_path / "root")]
+            assert not root['stale'] and root['total'] > 0
+            assert all(str(tmp_path / name) not in usage for name in names[:-1])
+        # Hung shares are probed once, not re-queued every tick
+        assert calls == {**{name: 1 for name in names[:-1]}, "root": 3}
+        assert inventory._threads <= len(names)
+    finally:
+        release.set()
+    # Once the shares answer they are reported again
+    deadline = time.monotonic() + 5
+    while len(inventory.usage()) < len(names) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not inventory.usage()[str(tmp_path / "nfs0")]['stale']
@@ -0,0 +1,80 @@
+"""sx-health-monitor probes against stub systemctl and ping binaries"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+@pytest.fixture
+def health(tool):
+    return tool("sx-health-monitor")
+
+def bare_monitor(health, **attrs):
+    """A HealthMonitor without the log, state and config files of __init__"""
+    monitor = health.HealthMonitor.__new__(health.HealthMonitor)
+    monitor.__dict__.update(attrs)
+    return monitor
+
+def stub(tmp_path, name, body):
+    path = tmp_path / name
+    path.write_text("#!/bin/sh\n" + body)
+    path.chmod(0o755)
+    return str(path)
+
+@pytest.fixture
+def systemctl(tmp_path):
+    # Mirrors `systemctl show --property=Id,ActiveState UNIT...`; units
+    # listed in $STUB_FAILED report "failed"
+    return stub(tmp_path, "systemctl", """
+shift 2
+for unit in "$@"; do
+    state=active
+    case " $STUB_FAILED " in *" $unit "*) state=failed ;; esac
+    printf 'Id=%s.service\\nActiveState=%s\\n\\n' "$unit" "$state"
+done
+""")
+
+def test_check_services_reports_inactive_units(health, systemctl, monkeypatch):
+    monitor = bare_monitor(health, systemctl=systemctl,
+                           critical_services=["sshd", "NetworkManager", "systemd-journald"])
+    assert monitor.check_services() == []
+    monkeypatch.setenv("STUB_FAILED", "sshd systemd-journald")
+    assert monitor.check_services() == ["sshd", "systemd-journald"]
+    assert bare_monitor(health, systemctl=systemctl, critical_services=[]).check_services() == []
+
+def test_check_services_rejects_short_output(health, tmp_path):
+    broken = stub(tmp_path, "systemctl-broken", "echo 'Failed to connect to bus' >&2\n")
+    monitor = bare_monitor(health, systemctl=broken, critical_services=["sshd"])
+    with pytest.raises(RuntimeError, match="Failed to connect to bus"):
+        monitor.check_services()
+
+def test_check_network(health, tmp_path):
+    assert bare_monitor(health, ping=stub(tmp_path, "ping-up", "exit 0\n")).check_network() is True
+    assert bare_monitor(health, ping=stub(tmp_path, "ping-down", "exit 1\n")).check_network() is False
+    assert bare_monitor(health, ping=str(tmp_path / "missing")).check_network() is False
+
+def test_check_network_times_out(health, tmp_path):
+    monitor = bare_monitor(health, ping=stub(tmp_path, "ping-hang", "exec sleep 30\n"))
+    started = time.monotonic()
+    assert monitor.check_network() is False
+    assert time.monotonic() - started < 10
+
+def test_first_cpu_reading_covers_sample_window(health, monkeypatch):
+    slept = []
+    monkeypatch.setattr(health.time, "sleep", slept.append)
+    fake = SimpleNamespace(cpu_percent=lambda interval=None: 42.0,
+                           virtual_memory=lambda: SimpleNamespace(percent=50.0),
+                           swap_memory=lambda: SimpleNamespace(percent=1.0))
+    monkeypatch.setattr(health, "psutil", fake)
+    
+    monitor = bare_monitor(health, _cpu_primed=time.monotonic())
+    assert monitor.get_system_usage() == (42.0, 50.0, 1.0)
+    assert len(slept) == 1 and 0.9 < slept[0] <= health.CPU_SAMPLE_WINDOW
+    # Later readings follow the check interval and never sleep
+    monitor.get_system_usage()
+    assert len(slept) == 1
+    
+    # A probe wait longer than the window needs no extra sleep
+    monitor = bare_monitor(health, _cpu_primed=time.monotonic() - 3)
+    monitor.get_system_usage()
+    assert len(slept) == 1
@@ -0,0 +1,88 @@
+"""InterfaceCounters over a tmp_path sysfs tree"""
+
+import os
+import shutil
+
+import pytest
+
+@pytest.fixture
+def netopt(tool):
+    return tool("sx-network-optimizer")
+
+@pytest.fixture
+def sysfs(tmp_path, netopt):
+    root = tmp_path / "sys"
+    
+    def add(name, base):
+        stats = root / name / "statistics"
+        stats.mkdir(parents=True)
+        for i, field in enumerate(netopt.InterfaceCounters.SYSFS_FIELDS):
+            (stats / field).write_text(f"{base + i}\n")
+    
+    def bump(name, amount):
+        # Rewrite in place: sysfs attributes are updated, not replaced
+        for field in netopt.InterfaceCounters.SYSFS_FIELDS:
+            path = root / name / "statistics" / field
+            value = int(path.read_text()) + amount
+            with open(path, 'r+') as f:
+                f.write(f"{value}\n")
+    
+    add.root = root
+    add.bump = bump
+    return add
+
+@pytest.fixture
+def counters(netopt, sysfs, tmp_path):
+    # No /proc/net/dev: every interface comes from the sysfs fallback
+    counters = netopt.InterfaceCounters(str(tmp_path / "missing"), str(sysfs.root))
+    yield counters
+    counters.close()
+
+def test_sysfs_descriptors_are_kept_open(counters, sysfs):
+    sysfs("eth0", 1000)
+    assert counters.read(["eth0"])["eth0"].rx_bytes == 1000
+    fds = counters._sysfs_fds["eth0"]
+    sysfs.bump("eth0", 500)
+    stats = counters.read(["eth0"])["eth0"]
+    assert (stats.rx_bytes, stats.tx_bytes, stats.tx_dropped) == (1500, 1501, 1507)
+    assert counters._sysfs_fds["eth0"] is fds
+
+def test_removed_interface_is_dropped_and_reopened(counters, sysfs):
+    sysfs("eth0", 1000)
+    sysfs("eth1", 5000)
+    counters.read(["eth0", "eth1"])
+    
+    shutil.rmtree(sysfs.root / "eth0")
+    stats = counters.read(["eth0", "eth1"])
+    assert set(stats) == {"eth1"}
+    assert "eth0" not in counters._sysfs_fds
+    
+    sysfs("eth0", 7)
+    assert counters.read(["eth0", "eth1"])["eth0"].rx_bytes == 7
+
+def test_renamed_interface_is_not_read_under_its_old_name(counters, sysfs):
+    sysfs("eth0", 1000)
+    counters.read(["eth0"])
+    
+    # eth0 becomes lan0 and a new device takes the name eth0
+    os.rename(sysfs.root / "eth0", sysfs.root / "lan0")
+    sysfs("eth0", 20)
+    sysfs.bump("lan0", 300)
+    stats = counters.read(["eth0", "lan0"])
+    assert stats["eth0"].rx_bytes == 20
+    assert stats["lan0"].rx_bytes == 1300
+    
+    # Renamed away with nothing taking its place
+    os.rename(sysfs.root / "eth0", sysfs.root / "eth9")
+    assert "eth0" not in counters.read(["eth0"])
+    assert "eth0" not in counters._sysfs_fds
+
+def test_close_releases_descriptors(netopt, sysfs, tmp_path):
+    sysfs("eth0", 1)
+    counters = netopt.InterfaceCounters(str(tmp_path / "missing"), str(sysfs.root))
+    counters.read(["eth0"])
+    fds = list(counters._sysfs_fds["eth0"])
+    counters.close()
+    for fd in fds:
+        with pytest.raises(OSError):
+            os.fstat(fd)
@@ -0,0 +1,125 @@
+"""LatencyProber against localhost echo responders"""
+
+import socket
+import threading
+
+import pytest
+
+@pytest.fixture
+def netopt(tool):
+    return tool("sx-network-optimizer")
+
+@pytest.fixture
+def udp_echo():
+    """A UDP echo responder on 127.0.0.1; drop(n) skips every n-th datagram"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(0.1)
+    options = {'drop': 0}
+    stop = threading.Event()
+    
+    def serve():
+        received = 0
+        while not stop.is_set():
+            try:
+                data, peer = sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            received += 1
+            if options['drop'] and received % options['drop'] == 0:
+                continue
+            sock.sendto(data, peer)
+    
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    yield sock.getsockname()[1], options
+    stop.set()
+    thread.join()
+    sock.close()
+
+@pytest.fixture
+def tcp_listener():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(64)
+    yield sock.getsockname()[1]
+    sock.close()
+
+def closed_port(kind):
+    sock = socket.socket(socket.AF_INET, kind)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+def test_udp_echo(netopt, udp_echo):
+    port, _ = udp_echo
+    spec = f"udp://127.0.0.1:{port}"
+    stats = netopt.LatencyProber(interval=0.01, timeout=0.5).probe([spec], count=8)[spec]
+    assert stats.method == "udp"
+    assert stats.packet_loss == 0.0
+    assert 0 < stats.min_ms <= stats.p50_ms <= stats.p99_ms <= stats.max_ms < 500
+
+def test_udp_losses_are_counted(netopt, udp_echo):
+    port, options = udp_echo
+    options['drop'] = 2
+    spec = f"udp://127.0.0.1:{port}"
+    stats = netopt.LatencyProber(interval=0.01, timeout=0.3).probe([spec], count=10)[spec]
+    assert stats.packet_loss == 50.0
+
+def test_udp_port_unreachable_is_a_round_trip(netopt):
+    spec = f"udp://127.0.0.1:{closed_port(socket.SOCK_DGRAM)}"
+    stats = netopt.LatencyProber(interval=0.01, timeout=0.5).probe([spec], count=5)[spec]
+    assert stats.packet_loss == 0.0
+
+def test_tcp_connect_and_refusal(netopt, tcp_listener):
+    listening = f"tcp://127.0.0.1:{tcp_listener}"
+    refused = f"tcp://127.0.0.1:{closed_port(socket.SOCK_STREAM)}"
+    results = netopt.LatencyProber(interval=0.01, timeout=0.5).probe([listening, refused], count=6)
+    for spec in (listening, refused):
+        assert results[spec].method == "tcp"
+        assert results[spec].packet_loss == 0.0
+
+def test_histogram_records_every_reply(netopt, udp_echo, monkeypatch):
+    port, _ = udp_echo
+    recorded = []
+    original = netopt.LatencyHistogram.record
+    monkeypatch.setattr(netopt.LatencyHistogram, "record",
+                        lambda self, rtt: (recorded.append(rtt), original(self, rtt)))
+    spec = f"udp://127.0.0.1:{port}"
+    netopt.LatencyProber(interval=0.01, timeout=0.5).probe([spec], count=7)
+    assert len(recorded) == 7
+
+def test_histogram_percentiles(netopt):
+    h = netopt.LatencyHistogram()
+    for rtt in range(1, 101):
+        h.record(float(rtt))
+    assert h.count == 100 and h.min == 1.0 and h.max == 100.0
+    assert abs(h.percentile(50) - 50) <= 50 * 0.05
+    assert abs(h.percentile(90) - 90) <= 90 * 0.05
+    assert h.percentile(100) <= 100.0
+
+@pytest.mark.parametrize("denied, expected", [
+    (set(), "icmp"),
+    ({socket.SOCK_DGRAM}, "icmp-raw"),
+    ({socket.SOCK_DGRAM, socket.SOCK_RAW}, "udp"),
+])
+def test_icmp_fallback_order(netopt, monkeypatch, denied, expected):
+    real_socket = socket.socket
+    opened = []
+    
+    def fake_socket(family=socket.AF_INET, kind=socket.SOCK_STREAM, proto=0):
+        if proto == socket.IPPROTO_ICMP:
+            opened.append(kind)
+            if kind in denied:
+                raise PermissionError("denied")
+            # Stand in for the ICMP socket with one anyone may open
+            return real_socket(family, socket.SOCK_DGRAM)
+        return real_socket(family, kind, proto)
+    
+    monkeypatch.setattr(netopt.socket, "socket", fake_socket)
+    target = netopt.LatencyProber()._open("127.0.0.1", 1)
+    target.sock.close()
+    assert target.method == expected
+    # Unprivileged datagram ICMP is tried first, then raw, then UDP
+    assert opened == [socket.SOCK_DGRAM, socket.SOCK_RAW][:len(denied) + 1]
@@ -0,0 +1,102 @@
+"""MetricsLog segment files: append, rotation, reopen, compaction"""
+
+import os
+
+import pytest
+
+HOUR = 1_699_999_200  # a UTC hour boundary
+
+@pytest.fixture
+def health(tool):
+    return tool("sx-health-monitor")
+
+def status(health, cpu, overall="healthy"):
+    return health.HealthStatus(
+        timestamp="", overall_health=overall, cpu_temp=40.0, cpu_usage=cpu,
+        memory_usage=50.0, swap_usage=0.0, disk_usage={'/': 10.0, '/home': 70.0},
+        load_average=(0.5, 0.25, 0.125), active_alerts=[], services_down=[])
+
+def test_append_and_query(health, tmp_path):
+    log = health.MetricsLog(tmp_path)
+    for i in range(5):
+        log.append(status(health, cpu=float(i)), HOUR + i * 60)
+    log.close()
+    
+    records = log.query(HOUR, HOUR + 3600)
+    assert [r[0] for r in records] == [HOUR + i * 60 for i in range(5)]
+    record = dict(zip(('timestamp',) + health.MetricsLog.FIELDS, records[2]))
+    assert record == {'timestamp': HOUR + 120, 'cpu_usage': 2.0, 'memory_usage': 50.0,
+                      'swap_usage': 0.0, 'load_1': 0.5, 'load_5': 0.25, 'load_15': 0.125,
+                      'cpu_temp': 40.0, 'disk_max': 70.0, 'health': 0.0}
+    # The range is half-open
+    assert [r[0] for r in log.query(HOUR + 60, HOUR + 180)] == [HOUR + 60, HOUR + 120]
+
+def test_rotates_hourly_and_queries_across_segments(health, tmp_path):
+    log = health.MetricsLog(tmp_path)
+    for minutes in (0, 30, 59, 60, 90, 125):
+        log.append(status(health, cpu=minutes), HOUR + minutes * 60)
+    log.close()
+    assert [p.name for p in log.segments()] == ["2023111422.seg", "2023111423.seg",
+                                                "2023111500.seg"]
+    record_size = health.MetricsLog.RECORD.size
+    header_size = health.MetricsLog.HEADER.size
+    assert [p.stat().st_size for p in log.segments()] == [
+        header_size + 3 * record_size, header_size + 2 * record_size, header_size + record_size]
+    assert [r[1] for r in log.query(HOUR + 45 * 60, HOUR + 7200)] == [59.0, 60.0, 90.0]
+    # Segments entirely outside the range are not even opened
+    (tmp_path / "2023111500.seg").write_bytes(b"garbage")
+    assert len(log.query(HOUR, HOUR + 7200)) == 5
+
+def test_reopen_continues_segment_and_drops_torn_record(health, tmp_path):
+    log = health.MetricsLog(tmp_path)
+    log.append(status(health, cpu=1.0), HOUR)
+    log.append(status(health, cpu=2.0), HOUR + 1)
+    log.close()
+    segment = log.segments()[0]
+    # A crash mid-write leaves part of a record behind
+    with open(segment, 'ab') as f:
+        f.write(b"\x01\x02\x03")
+    
+    reopened = health.MetricsLog(tmp_path)
+    reopened.append(status(health, cpu=3.0, overall="critical"), HOUR + 2)
+    reopened.close()
+    records = reopened.query(HOUR, HOUR + 3600)
+    assert [(r[1], r[-1]) for r in records] == [(1.0, 0.0), (2.0, 0.0), (3.0, 2.0)]
+    assert (segment.stat().st_size - health.MetricsLog.HEADER.size) % health.MetricsLog.RECORD.size == 0
+
+def test_segments_with_a_foreign_header_are_ignored(health, tmp_path):
+    log = health.MetricsLog(tmp_path)
+    log.append(status(health, cpu=1.0), HOUR)
+    log.close()
+    segment = log.segments()[0]
+    data = bytearray(segment.read_bytes())
+    data[:4] = b"XXXX"
+    segment.write_bytes(bytes(data))
+    assert log.query(HOUR, HOUR + 3600) == []
+
+def test_compaction_and_retention(health, tmp_path):
+    log = health.MetricsLog(tmp_path)
+    # Two minutes of 10 s samples, one warning in the second minute
+    for i in range(12):
+        overall = "warning" if i == 8 else "healthy"
+        log.append(status(health, cpu=float(i), overall=overall), HOUR + i * 10)
+    log.close()
+    old_segment = log.segments()[0]
+    expired = tmp_path / "2023100100.seg"
+    expired.write_bytes(old_segment.read_bytes())
+    
+    log.maintain(HOUR + 3600 + health.METRICS_COMPACT_AFTER + 1)
+    assert log.segments() == [old_segment]
+    records = log.query(HOUR, HOUR + 3600)
+    # One averaged record per minute; health keeps the worst state seen
+    assert [r[0] for r in records] == [HOUR, HOUR + 60]
+    assert [r[1] for r in records] == [2.5, 8.5]
+    assert [r[-1] for r in records] == [0.0, 1.0]
+    
+    # Compaction is flagged in the header and not repeated
+    mtime = os.stat(old_segment).st_mtime_ns
+    log.maintain(HOUR + 3600 + health.METRICS_COMPACT_AFTER + 2)
+    assert os.stat(old_segment).st_mtime_ns == mtime
+    
+    log.maintain(HOUR + 3600 + health.METRICS_RETENTION + 1)
+    assert log.segments() == []
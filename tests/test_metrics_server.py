@@ -0,0 +1,54 @@
+"""MetricsServer and MetricsWriter against a localhost scrape"""
+
+import urllib.error
+import urllib.request
+
+import pytest
+
+from sx_common import MetricsServer, MetricsWriter, parse_listen
+
+@pytest.fixture
+def server():
+    server = MetricsServer("127.0.0.1", 0)
+    server.start()
+    yield server
+    server.stop()
+
+def scrape(server, path="/metrics"):
+    host, port = server.address
+    with urllib.request.urlopen(f"http://{host}:{port}{path}", timeout=5) as response:
+        return response.headers["Content-Type"], response.read().decode()
+
+def test_scrape_returns_last_published_exposition(server):
+    w = MetricsWriter()
+    w.family("sx_cpu_usage_percent", "gauge", "Total CPU utilisation", [({}, 12.5)])
+    w.family("sx_disk_usage_percent", "gauge", "Filesystem utilisation",
+             [({'mountpoint': '/', 'device': '/dev/sda1'}, 40)])
+    server.publish(w.render())
+    
+    content_type, body = scrape(server)
+    assert content_type == MetricsServer.CONTENT_TYPE
+    assert "# TYPE sx_cpu_usage_percent gauge" in body
+    assert "sx_cpu_usage_percent 12.5" in body
+    assert 'sx_disk_usage_percent{mountpoint="/",device="/dev/sda1"} 40' in body
+    
+    server.publish("sx_processes 3\n")
+    assert scrape(server, "/")[1] == "sx_processes 3\n"
+
+def test_unknown_path_is_404(server):
+    with pytest.raises(urllib.error.HTTPError) as excinfo:
+        scrape(server, "/other")
+    assert excinfo.value.code == 404
+
+def test_histogram_and_label_escaping():
+    w = MetricsWriter()
+    w.histogram("sx_monitor_collector_duration_seconds", "Time spent in each collector",
+                [({'collector': 'di"sk'}, [(0.1, 1), ('+Inf', 2)], 0.35, 2)])
+    lines = w.render().splitlines()
+    assert 'sx_monitor_collector_duration_seconds_bucket{collector="di\\"sk",le="0.1"} 1' in lines
+    assert 'sx_monitor_collector_duration_seconds_bucket{collector="di\\"sk",le="+Inf"} 2' in lines
+    assert 'sx_monitor_collector_duration_seconds_count{collector="di\\"sk"} 2' in lines
+
+def test_parse_listen():
+    assert parse_listen("0.0.0.0:9100") == ("0.0.0.0", 9100)
+    assert parse_listen("9100") == ("127.0.0.1", 9100)
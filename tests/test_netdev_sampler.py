@@ -0,0 +1,82 @@
+"""NetDevSampler rates over a fixture /proc/net/dev"""
+
+from types import SimpleNamespace
+
+import pytest
+
+import sx_common
+from sx_common import NetDevSampler
+
+HEADER = """\
+Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+"""
+
+def dev_line(name, rx_bytes, rx_packets, tx_bytes, tx_packets, rx_errs=0, rx_drop=0, tx_errs=0, tx_drop=0):
+    rx = [rx_bytes, rx_packets, rx_errs, rx_drop, 0, 0, 0, 0]
+    tx = [tx_bytes, tx_packets, tx_errs, tx_drop, 0, 0, 0, 0]
+    return f"{name:>6}: " + " ".join(str(v) for v in rx + tx) + "\n"
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=50.0)
+    monkeypatch.setattr(sx_common, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+@pytest.fixture
+def dev(tmp_path):
+    path = tmp_path / "dev"
+    
+    def write(*lines):
+        path.write_text(HEADER + "".join(lines))
+    write.path = str(path)
+    return write
+
+def test_first_sample_has_totals_only(dev, clock):
+    dev(dev_line("lo", 1000, 10, 1000, 10), dev_line("eth0", 5000, 40, 700, 7, rx_drop=3))
+    totals, rates = NetDevSampler(dev.path).sample()
+    assert rates == {}
+    assert totals['eth0'] == {'rx_bytes': 5000, 'rx_packets': 40, 'rx_errors': 0, 'rx_drops': 3,
+                              'tx_bytes': 700, 'tx_packets': 7, 'tx_errors': 0, 'tx_drops': 0}
+    assert set(totals) == {'lo', 'eth0'}
+
+def test_rates_are_per_second_deltas(dev, clock):
+    sampler = NetDevSampler(dev.path)
+    dev(dev_line("eth0", 5000, 40, 700, 7))
+    sampler.sample()
+    clock.now += 2.0
+    dev(dev_line("eth0", 25000, 60, 900, 11, rx_errs=4), dev_line("wlan0", 10, 1, 10, 1))
+    totals, rates = sampler.sample()
+    assert rates['eth0'] == pytest.approx({
+        'rx_bytes': 10000, 'rx_packets': 10, 'rx_errors': 2, 'rx_drops': 0,
+        'tx_bytes': 100, 'tx_packets': 2, 'tx_errors': 0, 'tx_drops': 0})
+    # An interface that just appeared has no previous sample yet
+    assert 'wlan0' in totals and 'wlan0' not in rates
+    
+    # No time has passed: no rates rather than a division by zero
+    assert sampler.sample()[1] == {}
+
+def test_32bit_counter_wrap(dev, clock):
+    sampler = NetDevSampler(dev.path)
+    dev(dev_line("eth0", 2**32 - 1000, 2**32 - 1, 5, 5))
+    sampler.sample()
+    clock.now += 1.0
+    dev(dev_line("eth0", 3000, 4, 5, 5))
+    rates = sampler.sample()[1]['eth0']
+    assert rates['rx_bytes'] == 4000
+    assert rates['rx_packets'] == 5
+
+def test_recreated_interface_does_not_go_negative(dev, clock):
+    sampler = NetDevSampler(dev.path)
+    dev(dev_line("eth0", 2**40, 900, 123456, 800))
+    sampler.sample()
+    clock.now += 1.0
+    dev(dev_line("eth0", 100, 1, 50, 1))
+    rates = sampler.sample()[1]['eth0']
+    assert rates['rx_bytes'] == rates['tx_bytes'] == rates['rx_packets'] == 0
+    clock.now += 1.0
+    dev(dev_line("eth0", 300, 3, 50, 1))
+    assert sampler.sample()[1]['eth0']['rx_bytes'] == 200
+
+def test_unreadable_file(tmp_path, clock):
+    assert NetDevSampler(str(tmp_path / "missing")).sample() == ({}, {})
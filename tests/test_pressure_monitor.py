@@ -0,0 +1,83 @@
+"""PressureMonitor against a fake /proc/pressure tree"""
+
+import time
+
+import pytest
+
+@pytest.fixture
+def health(tool):
+    return tool("sx-health-monitor")
+
+def psi(some, full=None):
+    text = f"some avg10={some:.2f} avg60=1.00 avg300=0.50 total=123456\n"
+    if full is not None:
+        text += f"full avg10={full:.2f} avg60=0.00 avg300=0.00 total=42\n"
+    return text
+
+@pytest.fixture
+def pressure(tmp_path):
+    """System cpu and memory pressure (no io), plus one cgroup's memory"""
+    proc = tmp_path / "pressure"
+    proc.mkdir()
+    (proc / "cpu").write_text(psi(10.0))
+    (proc / "memory").write_text(psi(20.0, 5.0))
+    cgroup = tmp_path / "cgroup/system.slice/app.service"
+    cgroup.mkdir(parents=True)
+    (cgroup / "memory.pressure").write_text(psi(1.0, 0.0))
+    return proc, tmp_path / "cgroup"
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+def test_parse(health):
+    parsed = health.PressureMonitor.parse(psi(12.5, 3.25))
+    assert parsed == {
+        'some': {'avg10': 12.5, 'avg60': 1.0, 'avg300': 0.5, 'total': 123456.0},
+        'full': {'avg10': 3.25, 'avg60': 0.0, 'avg300': 0.0, 'total': 42.0},
+    }
+    assert health.PressureMonitor.parse("") == {}
+    with pytest.raises(ValueError):
+        health.PressureMonitor.parse("some avg10=high")
+
+def test_plain_files_are_polled_for_avg10(health, pressure, monkeypatch):
+    monkeypatch.setattr(health, "PSI_POLL_INTERVAL", 0.02)
+    proc, cgroup_root = pressure
+    fired = []
+    monitor = health.PressureMonitor(str(proc), str(cgroup_root), ["/system.slice/app.service/"],
+                                     on_event=fired.append)
+    try:
+        monitor.start()
+        # Regular files cannot take a trigger; missing io files are skipped
+        assert monitor.triggered == {}
+        assert sorted(monitor.polled) == ["cpu", "memory", "system.slice/app.service/memory"]
+        
+        # memory: avg10 20% >= 150ms/1s; cpu: 10% < 500ms/1s
+        assert wait_for(lambda: "memory" in fired)
+        assert "cpu" not in fired and "system.slice/app.service/memory" not in fired
+        
+        (cgroup_root / "system.slice/app.service/memory.pressure").write_text(psi(40.0, 30.0))
+        assert wait_for(lambda: "system.slice/app.service/memory" in fired)
+    finally:
+        monitor.close()
+    assert monitor.fds == {} and monitor.polled == []
+
+def test_samples_keys(health, pressure):
+    proc, cgroup_root = pressure
+    monitor = health.PressureMonitor(str(proc), str(cgroup_root), ["system.slice/app.service"])
+    monitor._fire("memory")
+    monitor._fire("memory")
+    monitor.events.appendleft((time.monotonic() - health.PSI_EVENT_WINDOW - 1, "cpu"))
+    samples = monitor.samples()
+    assert samples == {
+        'psi_stall:cpu': 0, 'psi_some:cpu': 10.0,
+        'psi_stall:memory': 2, 'psi_some:memory': 20.0, 'psi_full:memory': 5.0,
+        'psi_stall:system.slice/app.service/memory': 0,
+        'psi_some:system.slice/app.service/memory': 1.0,
+        'psi_full:system.slice/app.service/memory': 0.0,
+    }
+    # An unreadable source drops out of the samples entirely
+    (proc / "cpu").write_text("some avg10=garbage")
+    assert not any(key.endswith(':cpu') for key in monitor.samples())
@@ -0,0 +1,119 @@
+"""ProcessCache over a fake /proc tree"""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import sx_common
+from sx_common import ProcessCache
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(sx_common, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+@pytest.fixture
+def proc(tmp_path):
+    def spawn(pid, name, ticks=0, start=1000, rss_pages=0):
+        """Write /proc/<pid>/stat; utime+stime = ticks"""
+        fields = ["0"] * 49
+        fields[0] = "S"
+        fields[11], fields[12] = str(ticks - ticks // 2), str(ticks // 2)
+        fields[19] = str(start)
+        fields[21] = str(rss_pages)
+        (tmp_path / str(pid)).mkdir(exist_ok=True)
+        (tmp_path / str(pid) / "stat").write_text(f"{pid} ({name}) " + " ".join(fields) + "\n")
+    
+    def kill(pid):
+        (tmp_path / str(pid) / "stat").unlink()
+        (tmp_path / str(pid)).rmdir()
+    
+    (tmp_path / "self").mkdir()
+    (tmp_path / "meminfo").write_text("MemTotal: 1 kB\n")
+    return SimpleNamespace(root=str(tmp_path), spawn=spawn, kill=kill)
+
+def by_pid(cache):
+    return {sample['pid']: sample for sample in cache.samples}
+
+def test_first_refresh_has_no_cpu_deltas(proc, clock):
+    proc.spawn(1, "systemd", ticks=500, rss_pages=1000)
+    proc.spawn(42, "weird) name (x", ticks=10)
+    cache = ProcessCache(proc.root)
+    assert cache.refresh() == 2
+    samples = by_pid(cache)
+    assert samples[42]['name'] == "weird) name (x"
+    assert all(s['cpu_percent'] == 0.0 for s in samples.values())
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    assert samples[1]['memory_percent'] == pytest.approx(
+        1000 * page_size / (os.sysconf('SC_PHYS_PAGES') * page_size) * 100)
+
+def test_cpu_is_the_delta_since_the_last_refresh(proc, clock):
+    proc.spawn(1, "systemd", ticks=500)
+    proc.spawn(2, "busy", ticks=0)
+    cache = ProcessCache(proc.root)
+    cache.refresh()
+    
+    clock.now += 2.0
+    proc.spawn(1, "systemd", ticks=500 + CLOCK_TICKS // 10)
+    proc.spawn(2, "busy", ticks=3 * CLOCK_TICKS)  # 1.5 cores
+    cache.refresh()
+    samples = by_pid(cache)
+    assert samples[1]['cpu_percent'] == pytest.approx(5.0)
+    assert samples[2]['cpu_percent'] == pytest.approx(150.0)
+
+def test_exited_processes_are_evicted(proc, clock):
+    proc.spawn(1, "systemd")
+    proc.spawn(7, "short-lived", ticks=5)
+    cache = ProcessCache(proc.root)
+    cache.refresh()
+    proc.kill(7)
+    clock.now += 1.0
+    assert cache.refresh() == 1
+    assert set(by_pid(cache)) == {1}
+    assert set(cache._entries) == {1}
+
+def test_reused_pid_is_a_new_process(proc, clock):
+    proc.spawn(7, "old", ticks=10 * CLOCK_TICKS, start=1000)
+    cache = ProcessCache(proc.root)
+    cache.refresh()
+    # Same PID, later start time, and fewer ticks than the old process had
+    proc.spawn(7, "new", ticks=CLOCK_TICKS, start=5000)
+    clock.now += 1.0
+    cache.refresh()
+    sample = by_pid(cache)[7]
+    assert sample['name'] == "new"
+    assert sample['cpu_percent'] == 0.0
+    
+    proc.spawn(7, "new", ticks=2 * CLOCK_TICKS, start=5000)
+    clock.now += 1.0
+    cache.refresh()
+    assert by_pid(cache)[7]['cpu_percent'] == pytest.approx(100.0)
+
+def test_top_n(proc, clock):
+    cache = ProcessCache(proc.root)
+    for pid in range(1, 51):
+        proc.spawn(pid, f"p{pid}", ticks=0, rss_pages=pid % 7)
+    cache.refresh()
+    clock.now += 1.0
+    for pid in range(1, 51):
+        proc.spawn(pid, f"p{pid}", ticks=(pid * 37) % 50, rss_pages=pid % 7)
+    cache.refresh()
+    expected = sorted(cache.samples, key=lambda s: s['cpu_percent'], reverse=True)[:5]
+    assert cache.top('cpu_percent', 5) == expected
+    assert len(cache.top('memory_percent', 100)) == 50
+
+def test_export_has_cpu_figures(tool, proc, clock, tmp_path, monkeypatch):
+    monitor = tool("sx-monitor.py")
+    monkeypatch.setattr(monitor, "REPORT_DIR", tmp_path / "reports")
+    monkeypatch.setattr(monitor, "ProcessCache", lambda: ProcessCache(proc.root))
+    proc.spawn(9, "worker", ticks=0)
+    sx = monitor.SentinelXMonitor()
+    # The export's one-second window: the process cache was primed before it
+    clock.now += 1.0
+    proc.spawn(9, "worker", ticks=CLOCK_TICKS // 2)
+    top = sx.get_process_info()['top_cpu']
+    assert top[0]['pid'] == 9 and top[0]['cpu_percent'] == pytest.approx(50.0)
@@ -0,0 +1,33 @@
+"""RuleEngine windows, hysteresis and one-shot evaluation"""
+
+import pytest
+
+@pytest.fixture
+def health(tool):
+    return tool("sx-health-monitor")
+
+def fired(results):
+    return sorted(state.key for state, value in results)
+
+def test_for_window_and_hysteresis(health):
+    engine = health.RuleEngine([
+        {"name": "load_warning", "metric": "load", "threshold": 2, "clear": 1.5,
+         "for": 30, "severity": "warning"}])
+    assert fired(engine.evaluate({'load': 3}, now=0)) == []
+    assert fired(engine.evaluate({'load': 3}, now=29)) == []
+    assert fired(engine.evaluate({'load': 3}, now=30)) == ["load_warning"]
+    # Holds inside the hysteresis band, clears below it
+    assert fired(engine.evaluate({'load': 1.8}, now=31)) == ["load_warning"]
+    assert fired(engine.evaluate({'load': 1.0}, now=32)) == []
+
+def test_one_shot_ignores_for_windows(health):
+    engine = health.RuleEngine(health.DEFAULT_RULES, cpu_count=1)
+    samples = {'load': 5.0, 'network_down': 1, 'memory': 10.0}
+    assert fired(engine.evaluate(samples, now=0)) == []
+    engine = health.RuleEngine(health.DEFAULT_RULES, cpu_count=1)
+    assert fired(engine.evaluate(samples, now=0, windows=False)) == ["load_critical", "network_down"]
+
+def test_wildcards_bind_per_instance_and_worst_wins(health):
+    engine = health.RuleEngine(health.DEFAULT_RULES, cpu_count=4)
+    results = engine.evaluate({'disk:/': 96.0, 'disk:/home': 90.0, 'service:sshd': 0})
+    assert fired(results) == ["disk_critical_/", "disk_warning_/home"]
@@ -0,0 +1,106 @@
+"""SmartScanner against a fake smartctl and /sys/block"""
+
+import json
+
+import pytest
+
+ATA_OUTPUT = """SMART overall-health self-assessment test result: PASSED
+ID# ATTRIBUTE_NAME          FLAG     VALUE WORST THRESH TYPE      UPDATED  WHEN_FAILED RAW_VALUE
+194 Temperature_Celsius     0x0022   066   050   000    Old_age   Always       -       34
+"""
+NVME_OUTPUT = """SMART overall-health self-assessment test result: PASSED
+Temperature:                        41 Celsius
+"""
+FAILING_OUTPUT = """SMART overall-health self-assessment test result: FAILED!
+Current Drive Temperature:     58 C
+"""
+
+@pytest.fixture
+def health(tool):
+    return tool("sx-health-monitor")
+
+@pytest.fixture
+def fake_smart(tmp_path):
+    """A /sys/block tree plus a smartctl that answers per device
+
+    sdc is spun down: it exits 3 for `-n standby,3` and only reports when
+    woken with `-n never`. Every call is appended to calls.log.
+    """
+    sys_block = tmp_path / "sys-block"
+    for disk in ("sda", "sdb", "sdc", "nvme0n1", "loop0", "dm-0"):
+        (sys_block / disk / "device").mkdir(parents=True)
+    (sys_block / "ram0").mkdir()  # no device link: not a physical disk
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    (outputs / "sda").write_text(ATA_OUTPUT)
+    (outputs / "sdb").write_text(FAILING_OUTPUT)
+    (outputs / "sdc").write_text(ATA_OUTPUT)
+    (outputs / "nvme0n1").write_text(NVME_OUTPUT)
+    smartctl = tmp_path / "smartctl"
+    smartctl.write_text(f"""#!/bin/sh
+echo "$@" >> {tmp_path}/calls.log
+eval disk=\\${{$#}}
+disk=${{disk#/dev/}}
+if [ "$disk" = sdc ] && [ "$4" = standby,3 ]; then
+    exit 3
+fi
+cat {outputs}/$disk
+""")
+    smartctl.chmod(0o755)
+    return tmp_path, str(smartctl), str(sys_block)
+
+def scanner_for(health, fake_smart, **kwargs):
+    tmp_path, smartctl, sys_block = fake_smart
+    return health.SmartScanner(smartctl=smartctl, cache_file=str(tmp_path / "cache.json"),
+                               sys_block=sys_block, **kwargs)
+
+def finish(scanner):
+    """Wait for the scans poll() started"""
+    scanner.pool.shutdown(wait=True)
+
+def calls(fake_smart):
+    path = fake_smart[0] / "calls.log"
+    return path.read_text().splitlines() if path.exists() else []
+
+def test_parse(health):
+    assert health.SmartScanner.parse(ATA_OUTPUT) == {'status': "healthy", 'temperature': 34}
+    assert health.SmartScanner.parse(NVME_OUTPUT) == {'status': "healthy", 'temperature': 41}
+    assert health.SmartScanner.parse(FAILING_OUTPUT) == {'status': "failing", 'temperature': 58}
+    assert health.SmartScanner.parse("") == {'status': "unknown", 'temperature': None}
+
+def test_poll_scans_physical_disks_in_background(health, fake_smart):
+    scanner = scanner_for(health, fake_smart)
+    assert scanner.disks() == ["nvme0n1", "sda", "sdb", "sdc"]
+    # First poll starts the scans; a disk never checked is woken
+    scanner.poll()
+    finish(scanner)
+    assert all("-n never" in call for call in calls(fake_smart))
+    
+    results = scanner.poll(scan=False)
+    assert results["sda"]["status"] == "healthy" and results["sda"]["temperature"] == 34
+    assert results["sdb"]["status"] == "failing"
+    assert results["nvme0n1"]["temperature"] == 41
+    assert results["sdc"]["standby"] is False
+    cached = json.loads((fake_smart[0] / "cache.json").read_text())
+    assert sorted(cached) == ["nvme0n1", "sda", "sdb", "sdc"]
+
+def test_standby_disk_keeps_cached_result(health, fake_smart):
+    scanner = scanner_for(health, fake_smart)
+    scanner.poll()
+    finish(scanner)
+    
+    # Results are stale but the drives were checked recently: no wake-up
+    scanner = scanner_for(health, fake_smart, stale_after=0)
+    scanner.poll()
+    finish(scanner)
+    routine = calls(fake_smart)[4:]
+    assert len(routine) == 4 and all("-n standby,3" in call for call in routine)
+    sdc = scanner.poll(scan=False)["sdc"]
+    assert sdc["standby"] is True
+    assert sdc["status"] == "healthy" and sdc["temperature"] == 34
+
+def test_one_shot_poll_never_starts_scans(health, fake_smart):
+    scanner = scanner_for(health, fake_smart)
+    assert scanner.poll(scan=False) == {}
+    finish(scanner)
+    assert calls(fake_smart) == []
@@ -0,0 +1,143 @@
+"""SnapshotFile seqlock publish/read and the snapshot fallbacks"""
+
+import subprocess
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import sx_common
+from sx_common import SnapshotFile
+
+def header(path):
+    with open(path, 'rb') as f:
+        return SnapshotFile.HEADER.unpack(f.read(SnapshotFile.HEADER.size))
+
+def set_seq(path, seq):
+    with open(path, 'r+b') as f:
+        f.seek(SnapshotFile.SEQ_OFFSET)
+        f.write(SnapshotFile.SEQ.pack(seq))
+
+def test_publish_and_read(tmp_path):
+    path = tmp_path / "snap"
+    snap = SnapshotFile(path)
+    snap.publish({'cpu': 12.5, 'disks': ['/', '/home']})
+    data, updated = SnapshotFile.read(path)
+    assert data == {'cpu': 12.5, 'disks': ['/', '/home']}
+    assert updated == pytest.approx(time.time(), abs=5)
+    assert header(path)[3] == 2
+    
+    snap.publish({'cpu': 50})
+    assert SnapshotFile.read(path)[0] == {'cpu': 50}
+    assert header(path)[3] == 4
+    
+    snap.close()
+    assert not path.exists()
+    assert SnapshotFile.read(path) is None
+
+def test_odd_sequence_means_write_in_progress(tmp_path):
+    path = tmp_path / "snap"
+    snap = SnapshotFile(path)
+    snap.publish({'n': 1})
+    set_seq(path, 3)
+    assert SnapshotFile.read(path, retries=5) is None
+    
+    # The reader keeps retrying until the writer finishes
+    def finish():
+        time.sleep(0.05)
+        snap.publish({'n': 2})
+    writer = threading.Thread(target=finish)
+    snap._seq = 2
+    writer.start()
+    data, _ = SnapshotFile.read(path, retries=100_000)
+    writer.join()
+    assert data == {'n': 2}
+
+def test_torn_read_is_retried(tmp_path):
+    path = tmp_path / "snap"
+    SnapshotFile(path).publish({'n': 1})
+    
+    class Changing:
+        """Sequence that moves on while the payload is being copied"""
+        torn = 1
+        calls = 0
+        
+        def unpack_from(self, buffer, offset):
+            Changing.calls += 1
+            seq = SnapshotFile.SEQ.unpack_from(buffer, offset)
+            if Changing.torn:
+                Changing.torn -= 1
+                return (seq[0] + 2,)
+            return seq
+    
+    class Torn(SnapshotFile):
+        SEQ = Changing()
+    
+    assert Torn.read(path)[0] == {'n': 1}
+    assert Changing.calls == 2
+    
+    Changing.torn = 3  # a writer that never lets the reader finish
+    assert Torn.read(path, retries=3) is None
+
+def test_stale_dead_or_foreign_snapshots_are_ignored(tmp_path, monkeypatch):
+    path = tmp_path / "snap"
+    assert SnapshotFile.read(path) is None
+    
+    SnapshotFile(path).publish({'n': 1})
+    assert SnapshotFile.read(path, max_age=30) is not None
+    clock = SimpleNamespace(time=lambda: time.time() + 60, sleep=time.sleep)
+    monkeypatch.setattr(sx_common, "time", clock)
+    assert SnapshotFile.read(path, max_age=30) is None
+    monkeypatch.undo()
+    
+    # Published by a writer that has since exited
+    proc = subprocess.Popen(["true"])
+    proc.wait()
+    magic, version, _, seq, updated, length = header(path)
+    with open(path, 'r+b') as f:
+        f.write(SnapshotFile.HEADER.pack(magic, version, proc.pid, seq, updated, length))
+    assert SnapshotFile.read(path) is None
+    
+    path.write_bytes(b"not a snapshot at all, just some other file")
+    assert SnapshotFile.read(path) is None
+    path.write_bytes(b"")
+    assert SnapshotFile.read(path) is None
+
+def test_payload_outgrowing_the_mapping(tmp_path):
+    path = tmp_path / "snap"
+    snap = SnapshotFile(path, capacity=64)
+    snap.publish({'n': 1})
+    assert path.stat().st_size == SnapshotFile.HEADER.size + 64
+    
+    # A reader that mapped the old file keeps a consistent view of it
+    old = open(path, 'rb')
+    big = {'blob': 'x' * 1000}
+    snap.publish(big)
+    assert snap.capacity == 1024
+    assert path.stat().st_size == SnapshotFile.HEADER.size + 1024
+    assert SnapshotFile.read(path)[0] == big
+    assert b'"n": 1' in old.read()
+    old.close()
+    
+    # Shrinking the payload reuses the mapping; the length bounds the read
+    snap.publish({'n': 3})
+    assert snap.capacity == 1024
+    assert SnapshotFile.read(path)[0] == {'n': 3}
+    assert header(path)[3] == 6
+    snap.close()
+
+def test_commands_fall_back_without_a_daemon(tool, tmp_path, monkeypatch):
+    monitor = tool("sx-monitor.py")
+    path = tmp_path / "snap"
+    monkeypatch.setattr(monitor, "SNAPSHOT_FILE", path)
+    monkeypatch.setattr(monitor, "REPORT_DIR", tmp_path / "reports")
+    assert monitor.export_snapshot() is None
+    
+    snap = SnapshotFile(path)
+    snap.publish({'cpu': {'percent': 7}})
+    report = monitor.export_snapshot(tmp_path / "report.json")
+    assert (tmp_path / "report.json").read_text().count('"percent": 7') == 1
+    assert report == tmp_path / "report.json"
+    snap.close()
+    assert monitor.export_snapshot() is None
@@ -0,0 +1,100 @@
+"""SysctlTransaction against a fake /proc/sys tree"""
+
+import errno
+
+import pytest
+
+@pytest.fixture
+def netopt(tool):
+    return tool("sx-network-optimizer")
+
+@pytest.fixture
+def proc_sys(tmp_path):
+    values = {
+        "net/core/rmem_max": "212992",
+        "net/core/wmem_max": "212992",
+        "net/ipv4/tcp_rmem": "4096\t131072\t6291456",
+        "net/ipv4/tcp_congestion_control": "cubic",
+        "net/ipv4/conf/eth0.100/rp_filter": "1",
+    }
+    for rel, value in values.items():
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(value + "\n")
+    return tmp_path
+
+def value(proc_sys, rel):
+    return (proc_sys / rel).read_text().strip()
+
+def reject(monkeypatch, netopt, bad_param):
+    """Make the kernel refuse one parameter the way it does a bad value"""
+    original = netopt.SysctlTransaction._write
+    
+    def write(self, param, value):
+        if param == bad_param:
+            raise OSError(errno.EINVAL, "Invalid argument")
+        original(self, param, value)
+    
+    monkeypatch.setattr(netopt.SysctlTransaction, "_write", write)
+
+def test_apply_writes_only_differences(netopt, proc_sys):
+    tx = netopt.SysctlTransaction(str(proc_sys))
+    tx.stage({
+        "net.core.rmem_max": "16777216",
+        "net.core.wmem_max": "212992",
+        "net.ipv4.tcp_rmem": "4096 131072  6291456",
+        "net.ipv4.conf.eth0/100.rp_filter": "2",
+        "net.netfilter.nf_conntrack_max": "262144",
+    })
+    result = tx.apply()
+    assert result.changed == {
+        "net.core.rmem_max": ("212992", "16777216"),
+        "net.ipv4.conf.eth0/100.rp_filter": ("1", "2"),
+    }
+    assert sorted(result.unchanged) == ["net.core.wmem_max", "net.ipv4.tcp_rmem"]
+    assert result.missing == ["net.netfilter.nf_conntrack_max"]
+    assert result.failed is None and not result.rolled_back
+    assert value(proc_sys, "net/core/rmem_max") == "16777216"
+    assert value(proc_sys, "net/ipv4/conf/eth0.100/rp_filter") == "2"
+    assert not (proc_sys / "net/netfilter").exists()
+
+def test_failed_write_restores_earlier_writes(netopt, proc_sys, monkeypatch):
+    reject(monkeypatch, netopt, "net.ipv4.tcp_congestion_control")
+    tx = netopt.SysctlTransaction(str(proc_sys))
+    tx.stage({
+        "net.core.rmem_max": "16777216",
+        "net.core.wmem_max": "16777216",
+        "net.ipv4.tcp_congestion_control": "bogus",
+        "net.ipv4.tcp_rmem": "4096 87380 16777216",
+    })
+    result = tx.apply()
+    assert result.failed == ("net.ipv4.tcp_congestion_control", "Invalid argument")
+    assert result.rolled_back
+    assert list(result.changed) == ["net.core.rmem_max", "net.core.wmem_max"]
+    # Written values are put back; nothing after the failure is touched
+    assert value(proc_sys, "net/core/rmem_max") == "212992"
+    assert value(proc_sys, "net/core/wmem_max") == "212992"
+    assert value(proc_sys, "net/ipv4/tcp_congestion_control") == "cubic"
+    assert value(proc_sys, "net/ipv4/tcp_rmem") == "4096\t131072\t6291456"
+
+def test_rollback_runs_in_reverse_order(netopt, proc_sys, monkeypatch):
+    reject(monkeypatch, netopt, "net.ipv4.tcp_congestion_control")
+    writes = []
+    original = netopt.SysctlTransaction._write
+    monkeypatch.setattr(netopt.SysctlTransaction, "_write",
+                        lambda self, param, value: (writes.append((param, value)),
+                                                    original(self, param, value)))
+    tx = netopt.SysctlTransaction(str(proc_sys))
+    tx.stage({
+        "net.core.rmem_max": "1",
+        "net.core.wmem_max": "2",
+        "net.ipv4.tcp_congestion_control": "bogus",
+    })
+    tx.apply()
+    assert writes == [
+        ("net.core.rmem_max", "1"),
+        ("net.core.wmem_max", "2"),
+        ("net.ipv4.tcp_congestion_control", "bogus"),
+        ("net.core.wmem_max", "212992"),
+        ("net.core.rmem_max", "212992"),
+    ]
@@ -0,0 +1,57 @@
+"""TerminalRenderer keeps frames inside the terminal"""
+
+import os
+import re
+
+import pytest
+
+import sx_common
+from sx_common import TerminalRenderer
+
+def frame_rows(data):
+    """Map row -> text drawn there by one render() call"""
+    rows = {}
+    for row, text in re.findall(r'\033\[(\d+);1H(.*?)\033\[K', data):
+        rows[int(row)] = text
+    return rows
+
+@pytest.fixture
+def terminal(monkeypatch):
+    read_fd, write_fd = os.pipe()
+    monkeypatch.setattr(sx_common.shutil, "get_terminal_size",
+                        lambda: os.terminal_size((20, 5)))
+    
+    def render(renderer, lines):
+        renderer.render(lines)
+        return os.read(read_fd, 65536).decode()
+    
+    renderer = TerminalRenderer(fd=write_fd)
+    yield renderer, render
+    os.close(read_fd)
+    os.close(write_fd)
+
+def test_fit_counts_columns_not_escapes():
+    assert TerminalRenderer.fit("short", 10) == "short"
+    assert TerminalRenderer.fit("x" * 12, 10) == "x" * 10 + "\033[0m"
+    coloured = "\033[91mCPU: 99%\033[0m and more text"
+    cut = TerminalRenderer.fit(coloured, 8)
+    assert cut == "\033[91mCPU: 99%\033[0m\033[0m"
+    # Wide characters take two columns
+    assert TerminalRenderer.fit("🔥🔥🔥", 5) == "🔥🔥\033[0m"
+
+def test_frame_cut_to_terminal_size(terminal):
+    renderer, render = terminal
+    lines = [f"line {i} " + "=" * 30 for i in range(10)]
+    rows = frame_rows(render(renderer, lines))
+    # 5 rows: four for the frame, the last one keeps the cursor
+    assert sorted(rows) == [1, 2, 3, 4]
+    assert all(len(text) <= 20 + len("\033[0m") for text in rows.values())
+
+def test_diff_only_redraws_changed_rows(terminal):
+    renderer, render = terminal
+    render(renderer, ["a", "b", "c"])
+    rows = frame_rows(render(renderer, ["a", "B", "c"]))
+    assert rows == {2: "B"}
+    # Rows past the height are ignored, so changing them redraws nothing
+    assert frame_rows(render(renderer, ["a", "B", "c", "d", "e", "f"])) == {4: "d"}
+    assert frame_rows(render(renderer, ["a", "B", "c", "d", "E", "F"])) == {}
@@ -0,0 +1,82 @@
+"""sx-test's parallel executor: resource tags and timed-out tests"""
+
+import threading
+import time
+
+import pytest
+
+@pytest.fixture
+def sxtest(tool, monkeypatch):
+    module = tool("sx-test")
+    monkeypatch.setattr(module, "RESOURCE_LIMITS", {'network': 1})
+    return module
+
+def bare_tester(sxtest, jobs=4):
+    """A SentinelXTester without the report directory of __init__"""
+    tester = sxtest.SentinelXTester.__new__(sxtest.SentinelXTester)
+    tester.__dict__.update(test_results=[], passed=0, failed=0, warnings=0, skipped=0,
+                           jobs=jobs, tests={}, categories=[], _local=threading.local())
+    tester.category("Runner")
+    return tester
+
+def recorder(spans, name, hold=None, seconds=0.0):
+    def check():
+        started = time.monotonic()
+        if hold is not None:
+            hold.wait()
+        time.sleep(seconds)
+        spans[name] = (started, time.monotonic())
+        return True, name
+    return check
+
+def test_timed_out_test_keeps_its_resource_tags(sxtest):
+    spans = {}
+    tester = bare_tester(sxtest)
+    # Times out at 0.3 s but returns at 0.45 s, within the grace period
+    tester.test("slow", "Slow network check", recorder(spans, "slow", seconds=0.45),
+                resources=('network',), timeout=0.3)
+    tester.test("next", "Next network check", recorder(spans, "next"), resources=('network',))
+    tester.test("local", "Unrelated check", recorder(spans, "local"))
+    tester.execute()
+    
+    results = {r['name']: r for r in tester.test_results}
+    assert results['slow']['status'] == "ERROR"
+    assert "Timed out" in results['slow']['message']
+    assert results['next']['status'] == "PASS"
+    # The conflicting test only started once the timed-out one had returned
+    assert spans['next'][0] >= spans['slow'][1]
+    # Untagged tests are not held back
+    assert spans['local'][0] < spans['slow'][1]
+    assert (tester.passed, tester.failed) == (2, 1)
+
+def test_conflicting_tests_are_skipped_if_the_tags_never_come_back(sxtest):
+    spans = {}
+    release = threading.Event()
+    tester = bare_tester(sxtest)
+    tester.test("hung", "Hung network check", recorder(spans, "hung", hold=release),
+                resources=('network',), timeout=0.1)
+    tester.test("next", "Next network check", recorder(spans, "next"), resources=('network',))
+    try:
+        started = time.monotonic()
+        tester.execute()
+        # Deadline plus one more timeout of grace, not forever
+        assert time.monotonic() - started < 1.0
+    finally:
+        release.set()
+    results = {r['name']: r for r in tester.test_results}
+    assert results['hung']['status'] == "ERROR"
+    assert results['next'] == dict(results['next'], status="SKIP",
+                                   message="Resources held by a timed-out test")
+    assert "next" not in spans
+
+def test_timed_out_tests_keep_their_job_slot(sxtest):
+    spans = {}
+    tester = bare_tester(sxtest, jobs=1)
+    tester.test("slow", "Slow check", recorder(spans, "slow", seconds=0.45), timeout=0.3)
+    tester.test("next", "Next check", recorder(spans, "next"), timeout=0.1)
+    tester.execute()
+    results = {r['name']: r for r in tester.test_results}
+    # Had "next" been queued behind "slow" in the pool, its 0.2 s deadline
+    # would have run out while it waited
+    assert results['next']['status'] == "PASS"
+    assert spans['next'][0] >= spans['slow'][1]
@@ -0,0 +1,79 @@
+"""RingBuffer and TimeSeriesStore from tools/python/sx-monitor.py"""
+
+import pytest
+
+@pytest.fixture
+def monitor(tool):
+    return tool("python/sx-monitor.py")
+
+def filled(monitor, capacity, count, start=1000.0):
+    buffer = monitor.RingBuffer(capacity)
+    for i in range(count):
+        buffer.append(float(i), start + i)
+    return buffer
+
+def test_partial_buffer_keeps_insertion_order(monitor):
+    buffer = filled(monitor, 5, 3)
+    assert len(buffer) == 3
+    assert buffer.window() == monitor.array('f', [0.0, 1.0, 2.0])
+    assert buffer.latest() == 2.0
+    assert monitor.RingBuffer(5).latest(default=-1.0) == -1.0
+
+def test_wraparound_drops_oldest(monitor):
+    buffer = filled(monitor, 5, 12)
+    assert len(buffer) == 5
+    assert list(buffer.window()) == [7.0, 8.0, 9.0, 10.0, 11.0]
+    assert buffer.latest() == 11.0
+    # Capacity fixes the memory: 4 byte values and 8 byte timestamps
+    assert buffer.nbytes() == 5 * 12
+
+def test_window_cuts_by_timestamp_across_the_wrap(monitor):
+    buffer = filled(monitor, 5, 8)  # holds t=1003..1007
+    assert list(buffer.window(2, now=1007.0)) == [5.0, 6.0, 7.0]
+    assert list(buffer.window(0, now=1007.0)) == [7.0]
+    assert list(buffer.window(100, now=1007.0)) == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert list(buffer.window(1, now=2000.0)) == []
+
+def test_stats(monitor):
+    buffer = filled(monitor, 200, 101)  # values 0..100
+    stats = buffer.stats(percentiles=(50, 95, 100))
+    assert stats == {'min': 0.0, 'max': 100.0, 'mean': 50.0, 'samples': 101,
+                     'p50': 50.0, 'p95': 95.0, 'p100': 100.0}
+    # Windows count back from the wall clock; these samples are from 1970
+    assert buffer.stats(10) is None
+    assert monitor.RingBuffer(4).stats() is None
+
+def test_store_creates_series_on_first_write(monitor):
+    store = monitor.TimeSeriesStore(3)
+    for t in range(5):
+        store.record('cpu', float(t), 1000.0 + t)
+        store.record('net.eth0.rx_bytes', t * 10.0, 1000.0 + t)
+    store.record('net.eth1.rx_bytes', 1.0, 1004.0)
+    assert sorted(store.names('net.')) == ['net.eth0.rx_bytes', 'net.eth1.rx_bytes']
+    assert list(store.get('cpu').window()) == [2.0, 3.0, 4.0]
+    assert store.get('missing') is None and store.stats('missing') is None
+    assert store.stats('net.eth0.rx_bytes')['max'] == 40.0
+    assert store.nbytes() == 3 * 3 * 12
+
+@pytest.mark.parametrize("configured, expected, warned", [
+    (0.25, 0.25, False),
+    (5, 5.0, False),
+    ("0.5", 0.5, False),
+    (0.01, 0.1, True),
+    (0, 5, True),
+    (-1, 5, True),
+    ("soon", 5, True),
+    (None, 5, True),
+    (float("nan"), 5, True),
+    (float("inf"), 5, True),
+])
+def test_check_interval_validation(monitor, tmp_path, monkeypatch, capsys,
+                                   configured, expected, warned):
+    monkeypatch.setattr(monitor, "CONFIG_DIR", tmp_path)
+    config = dict(monitor.DEFAULT_CONFIG, check_interval=configured, history_seconds=60)
+    system = monitor.SystemMonitor(config)
+    assert system.config['check_interval'] == expected
+    assert system.history.capacity == max(60, int(60 / expected))
+    assert ("Warning" in capsys.readouterr().err) == warned
+    # The caller's config is left alone
+    assert config['check_interval'] is configured
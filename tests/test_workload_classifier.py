@@ -0,0 +1,108 @@
+"""WorkloadClassifier and ModeSwitchLimiter replayed over a recorded trace"""
+
+import json
+
+import pytest
+
+@pytest.fixture
+def netopt(tool):
+    return tool("sx-network-optimizer")
+
+LOW_MBPS, HIGH_MBPS = 1, 400
+
+def write_trace(path, mode=None):
+    """700 one-second ticks of eth0 counters with 1000 byte packets
+
+    - 0-119 s: 1 Mbps, with a 10 s burst of 400 Mbps at 60 s
+    - 120-299 s: 400 Mbps
+    - 300-699 s: 1 Mbps
+    - a 150 ms latency sample at 200 s, then 10 ms samples at 210 and 220 s
+    """
+    records = [] if mode is None else [{'t': 1000.0, 'mode': mode}]
+    rx_bytes = 0
+    for t in range(700):
+        mbps = HIGH_MBPS if 120 <= t < 300 or 60 <= t < 70 else LOW_MBPS
+        if t:
+            rx_bytes += mbps * 125_000
+        records.append({'t': 1000.0 + t, 'counters': {'eth0': [rx_bytes, 0, rx_bytes // 1000, 0]}})
+        if t in (200, 210, 220):
+            avg = 150.0 if t == 200 else 10.0
+            records.append({'t': 1000.0 + t, 'latency': {
+                'min_ms': avg, 'max_ms': avg, 'avg_ms': avg, 'jitter_ms': 1.0, 'packet_loss': 0.0}})
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    return str(path)
+
+def test_replay_switch_points(netopt, tmp_path):
+    events = netopt.replay_trace(write_trace(tmp_path / "trace.jsonl", mode="balanced"))
+    assert [(t, mode, applied) for t, mode, _, applied in events] == [
+        (0.0, "balanced", False),
+        # The 60 s burst only lifts the 30 s half-life average to ~83 Mbps,
+        # so it never crosses 100 Mbps; the sustained load does at 129 s
+        (129.0, "throughput", False),
+        # ...and is applied once recommended for stable_for (60 s)
+        (189.0, "throughput", True),
+        # A 20 s latency spike flips the recommendation but is never applied
+        (200.0, "lowlatency", False),
+        (220.0, "throughput", False),
+        (359.0, "balanced", False),
+        # Stable since 419 s, but held until min_interval (300 s) after 189 s
+        (489.0, "balanced", True),
+    ]
+
+def test_replay_without_a_recorded_mode_applies_at_startup(netopt, tmp_path):
+    trace = write_trace(tmp_path / "trace.jsonl")
+    assert (60.0, "balanced", "Normal network usage", True) in netopt.replay_trace(trace)
+    # An explicit current mode seeds the limiter the same way the header does
+    assert not any(applied and t < 100 for t, _, _, applied in
+                   netopt.replay_trace(trace, current="balanced"))
+
+def test_limiter_hysteresis(netopt):
+    limiter = netopt.ModeSwitchLimiter(stable_for=10, min_interval=30, current="balanced")
+    assert not limiter.offer("balanced", 0)
+    assert not limiter.offer("throughput", 1)
+    assert not limiter.offer("balanced", 5)  # flapped back: candidate dropped
+    assert not limiter.offer("throughput", 6)
+    assert not limiter.offer("throughput", 15)
+    assert limiter.offer("throughput", 16)
+    assert limiter.current == "throughput"
+    assert not limiter.offer("balanced", 17)
+    assert not limiter.offer("balanced", 45)  # stable, but within min_interval
+    assert limiter.offer("balanced", 46)
+
+def test_recommend_rules(netopt):
+    def classifier(rx_mbps=0.0, pps=0.0, packet_size=0.0, latency=None):
+        c = netopt.WorkloadClassifier()
+        c.interfaces = {'eth0': {'rx_mbps': rx_mbps, 'tx_mbps': 0.0, 'pps': pps,
+                                 'packet_size': packet_size}}
+        if latency is not None:
+            c.latency = {'avg_ms': latency[0], 'jitter_ms': latency[1]}
+        return c.recommend()[0]
+    
+    assert classifier() == "balanced"
+    assert classifier(rx_mbps=150) == "throughput"
+    assert classifier(rx_mbps=150, latency=(120.0, 1.0)) == "lowlatency"
+    assert classifier(pps=5000, packet_size=100) == "lowlatency"
+    assert classifier(pps=5000, packet_size=1400) == "balanced"
+    assert classifier(latency=(20.0, 40.0)) == "lowlatency"
+
+def test_current_mode_from_sysctl(netopt, tmp_path):
+    optimizer = netopt.NetworkOptimizer.__new__(netopt.NetworkOptimizer)
+    optimizer.proc_sys = str(tmp_path)
+    assert optimizer.current_mode() is None
+    
+    def write(params):
+        for param, value in params.items():
+            path = tmp_path.joinpath(*param.split('.'))
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(value.replace(' ', '\t') + "\n")
+    
+    write(netopt.TCP_PROFILES["throughput"])
+    assert optimizer.current_mode() == "throughput"
+    # Parameters the kernel lacks do not count against a profile
+    (tmp_path / "net/core/somaxconn").unlink()
+    assert optimizer.current_mode() == "throughput"
+    
+    write(netopt.TCP_PROFILES["balanced"])
+    assert optimizer.current_mode() == "balanced"
+    write({"net.ipv4.tcp_congestion_control": "reno"})
+    assert optimizer.current_mode() is None
@@ -10,19 +10,47 @@ Real-time system monitoring with alerts and logging.
 
 import os
 import sys
+import math
 import time
 import psutil
 import json
 import argparse
+import bisect
+import shutil
+import socket
+import subprocess
+import tempfile
+import tracemalloc
+from array import array
 from datetime import datetime
-from collections import deque
 from pathlib import Path
 
+# Shared components live in /usr/lib/sentinelx once installed; SX_LIB_DIR
+# overrides that, e.g. SX_LIB_DIR=tools when running from a checkout
+sys.path.insert(1, os.environ.get("SX_LIB_DIR", "/usr/lib/sentinelx"))
+from sx_common import (
+    DEFAULT_METRICS_PORT, CgroupAccounting, CollectorStats, ConnectionSummary,
+    DiskInventory, MetricsServer, MetricsWriter, NetDevSampler, ProcessCache,
+    TerminalRenderer, parse_listen
+)
+
 # Constants
 VERSION = "1.0.0"
 CONFIG_DIR = Path.home() / ".config" / "sx-monitor"
 LOG_FILE = CONFIG_DIR / "health.log"
 CONFIG_FILE = CONFIG_DIR / "config.json"
+MIN_CHECK_INTERVAL = 0.1  # seconds; shorter intervals are raised to this
+# Per-interface rate families exported on the metrics endpoint
+NETWORK_RATE_FAMILIES = (
+    ('rx_bytes', "Bytes received per interface"),
+    ('tx_bytes', "Bytes sent per interface"),
+    ('rx_packets', "Packets received per interface"),
+    ('tx_packets', "Packets sent per interface"),
+    ('rx_errors', "Receive errors per interface"),
+    ('tx_errors', "Transmit errors per interface"),
+    ('rx_drops', "Received packets dropped per interface"),
+    ('tx_drops', "Transmitted packets dropped per interface"),
+)
 
 # Default thresholds
 DEFAULT_CONFIG = {
@@ -31,6 +59,9 @@ DEFAULT_CONFIG = {
     "disk_threshold": 90.0,
     "temperature_threshold": 75.0,
     "check_interval": 5,
+    "history_seconds": 4 * 3600,
+    "alert_window": 0,
+    "connection_states": True,
     "alert_enabled": True,
     "log_enabled": True
 }
@@ -44,26 +75,203 @@ class Colors:
     BOLD = '\033[1m'
     END = '\033[0m'
 
+class RingBuffer:
+    """Fixed-size time series backed by float arrays
+
+    Values are stored as 32-bit floats and timestamps as doubles, so each
+    sample costs 12 bytes regardless of how long the monitor runs.
+    """
+    
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.values = array('f', bytes(4 * capacity))
+        self.times = array('d', bytes(8 * capacity))
+        self.count = 0
+        self._next = 0
+    
+    def append(self, value, timestamp=None):
+        """Add a sample, overwriting the oldest once full"""
+        self.values[self._next] = value
+        self.times[self._next] = time.time() if timestamp is None else timestamp
+        self._next = (self._next + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+    
+    def __len__(self):
+        return self.count
+    
+    def _ordered(self, data):
+        """Return the stored samples of `data` oldest first"""
+        if self.count < self.capacity:
+            return data[:self.count]
+        return data[self._next:] + data[:self._next]
+    
+    def window(self, seconds=None, now=None):
+        """Return the values of the last `seconds` seconds (all if None)"""
+        values = self._ordered(self.values)
+        if seconds is None:
+            return values
+        cutoff = (time.time() if now is None else now) - seconds
+        start = bisect.bisect_left(self._ordered(self.times), cutoff)
+        return values[start:]
+    
+    def latest(self, default=0.0):
+        """Return the most recent value"""
+        if not self.count:
+            return default
+        return self.values[self._next - 1]
+    
+    def stats(self, seconds=None, percentiles=(50, 95)):
+        """Return min/max/mean and the requested percentiles over a window"""
+        values = self.window(seconds)
+        if not values:
+            return None
+        ordered = sorted(values)
+        last = len(ordered) - 1
+        result = {
+            'min': ordered[0],
+            'max': ordered[-1],
+            'mean': sum(values) / len(values),
+            'samples': len(values),
+        }
+        for p in percentiles:
+            result[f'p{p}'] = ordered[min(last, round(p / 100 * last))]
+        return result
+    
+    def nbytes(self):
+        """Memory held by the sample arrays"""
+        return (self.values.itemsize + self.times.itemsize) * self.capacity
+
+class TimeSeriesStore:
+    """Named ring buffers sharing one capacity
+
+    Series are created on first write, e.g. 'cpu', 'cpu.core3',
+    'disk./home', 'net.eth0.rx_bytes' or 'temp.coretemp'.
+    """
+    
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.series = {}
+    
+    def record(self, name, value, timestamp=None):
+        """Append a sample to the named series"""
+        buffer = self.series.get(name)
+        if buffer is None:
+            buffer = self.series[name] = RingBuffer(self.capacity)
+        buffer.append(value, timestamp)
+    
+    def get(self, name):
+        """Return the named series or None"""
+        return self.series.get(name)
+    
+    def stats(self, name, seconds=None, percentiles=(50, 95)):
+        """Window statistics for a series, or None if it has no samples"""
+        buffer = self.series.get(name)
+        return buffer.stats(seconds, percentiles) if buffer else None
+    
+    def names(self, prefix=""):
+        """Return series names starting with `prefix`"""
+        return [name for name in self.series if name.startswith(prefix)]
+    
+    def nbytes(self):
+        """Memory held by all series"""
+        return sum(buffer.nbytes() for buffer in self.series.values())
+
+class CpuSampler:
+    """Delta-based CPU utilisation sampler backed by /proc/stat
+
+    Keeps the previous counters so every call to sample() returns the
+    utilisation since the last tick from a single read, without sleeping.
+    Total and per-core values therefore always cover the same window.
+    """
+    
+    def __init__(self, stat_path="/proc/stat"):
+        self.stat_path = stat_path
+        self._previous = None
+    
+    def _read_counters(self):
+        """Return (busy, total) jiffies for the aggregate line and each core"""
+        counters = []
+        with open(self.stat_path, 'rb') as f:
+            for line in f:
+                if not line.startswith(b'cpu'):
+                    break
+                # user nice system idle iowait irq softirq steal; guest time
+                # is already accounted in user/nice so it is left out
+                values = [int(v) for v in line.split()[1:9]]
+                idle = values[3] + (values[4] if len(values) > 4 else 0)
+                total = sum(values)
+                counters.append((total - idle, total))
+        return counters
+    
+    def sample(self):
+        """Return (total_percent, [per_core_percent, ...]) since last sample"""
+        current = self._read_counters()
+        previous = self._previous
+        # First sample, or CPUs were hotplugged: measure since boot
+        if previous is None or len(previous) != len(current):
+            previous = [(0, 0)] * len(current)
+        self._previous = current
+        
+        percents = []
+        for (busy, total), (prev_busy, prev_total) in zip(current, previous):
+            delta_total = total - prev_total
+            if delta_total <= 0:
+                percents.append(0.0)
+            else:
+                busy_pct = (busy - prev_busy) / delta_total * 100
+                percents.append(round(min(max(busy_pct, 0.0), 100.0), 1))
+        
+        if not percents:
+            return 0.0, []
+        return percents[0], percents[1:]
+
 class SystemMonitor:
     """Main system monitoring class"""
     
-    def __init__(self, config=None):
-        self.config = config or DEFAULT_CONFIG
-        self.history = {
-            'cpu': deque(maxlen=60),
-            'memory': deque(maxlen=60),
-            'disk': deque(maxlen=60),
-            'temp': deque(maxlen=60)
-        }
+    def __init__(self, config=None, self_stats=False, trace_alloc=False):
+        self.config = dict(config or DEFAULT_CONFIG)
+        # A zero, negative or garbled interval would spin the loop and size
+        # the history by a division by zero
+        configured = self.config.get('check_interval', DEFAULT_CONFIG['check_interval'])
+        try:
+            interval = float(configured)
+        except (TypeError, ValueError):
+            interval = math.nan
+        if not 0 < interval < math.inf:
+            interval = DEFAULT_CONFIG['check_interval']
+            print(f"Warning: invalid check_interval {configured!r}, using {interval}s", file=sys.stderr)
+        elif interval < MIN_CHECK_INTERVAL:
+            print(f"Warning: check_interval {interval}s raised to {MIN_CHECK_INTERVAL}s", file=sys.stderr)
+            interval = MIN_CHECK_INTERVAL
+        self.config['check_interval'] = interval
+        history_seconds = self.config.get('history_seconds', DEFAULT_CONFIG['history_seconds'])
+        self.history = TimeSeriesStore(
+            max(60, int(history_seconds / self.config['check_interval']))
+        )
         self.alerts_triggered = 0
         self.start_time = time.time()
+        self.cpu_sampler = CpuSampler()
+        self.net_sampler = NetDevSampler()
+        self.renderer = TerminalRenderer()
+        self.process_cache = ProcessCache()
+        self.disk_inventory = DiskInventory()
+        self.connection_summary = ConnectionSummary()
+        self.cgroup_accounting = CgroupAccounting()
+        self.collector_stats = CollectorStats(trace_alloc)
+        self.self_stats = self_stats
         
         # Create config directory
         CONFIG_DIR.mkdir(parents=True, exist_ok=True)
     
     def get_cpu_info(self):
         """Get CPU usage and frequency"""
-        cpu_percent = psutil.cpu_percent(interval=1, percpu=False)
+        try:
+            cpu_percent, per_cpu = self.cpu_sampler.sample()
+        except (OSError, ValueError):
+            # No usable /proc/stat: fall back to psutil's own delta tracking
+            per_cpu = psutil.cpu_percent(interval=None, percpu=True)
+            cpu_percent = sum(per_cpu) / len(per_cpu) if per_cpu else 0.0
         cpu_freq = psutil.cpu_freq()
         cpu_count = psutil.cpu_count()
         
@@ -72,7 +280,7 @@ class SystemMonitor:
             'freq_current': cpu_freq.current if cpu_freq else 0,
             'freq_max': cpu_freq.max if cpu_freq else 0,
             'count': cpu_count,
-            'per_cpu': psutil.cpu_percent(percpu=True)
+            'per_cpu': per_cpu
         }
     
     def get_memory_info(self):
@@ -91,21 +299,20 @@ class SystemMonitor:
         }
     
     def get_disk_info(self):
-        """Get disk usage"""
+        """Get disk usage and per-device I/O rates"""
         disks = {}
-        for partition in psutil.disk_partitions():
-            try:
-                usage = psutil.disk_usage(partition.mountpoint)
-                disks[partition.mountpoint] = {
-                    'total': usage.total,
-                    'used': usage.used,
-                    'free': usage.free,
-                    'percent': usage.percent,
-                    'device': partition.device,
-                    'fstype': partition.fstype
-                }
-            except PermissionError:
-                continue
+        rates = self.disk_inventory.io_rates()
+        for mount, info in self.disk_inventory.usage().items():
+            disks[mount] = {
+                'total': info['total'],
+                'used': info['used'],
+                'free': info['free'],
+                'percent': info['percent'],
+                'device': info['device'],
+                'fstype': info['fstype'],
+                'stale': info['stale'],
+                'io': rates.get(info['disk'], {})
+            }
         
         return disks
     
@@ -113,6 +320,10 @@ class SystemMonitor:
         """Get CPU temperature (if available)"""
         try:
             temps = psutil.sensors_temperatures()
+            sensors = {}
+            for name, entries in temps.items():
+                for i, entry in enumerate(entries):
+                    sensors[f"{name}.{entry.label or i}"] = entry.current
             if temps:
                 # Try common temperature sensor names
                 for name in ['coretemp', 'k10temp', 'cpu_thermal']:
@@ -120,51 +331,64 @@ class SystemMonitor:
                         return {
                             'current': temps[name][0].current,
                             'high': temps[name][0].high,
-                            'critical': temps[name][0].critical
+                            'critical': temps[name][0].critical,
+                            'sensors': sensors
                         }
-            return {'current': 0, 'high': 0, 'critical': 0}
+            return {'current': 0, 'high': 0, 'critical': 0, 'sensors': sensors}
         except:
-            return {'current': 0, 'high': 0, 'critical': 0}
+            return {'current': 0, 'high': 0, 'critical': 0, 'sensors': {}}
     
     def get_network_info(self):
         """Get network statistics"""
-        net_io = psutil.net_io_counters()
-        connections = len(psutil.net_connections())
+        totals, rates = self.net_sampler.sample()
+        sockets = self.connection_summary.collect(
+            states=self.config.get('connection_states', True))
         
         return {
-            'bytes_sent': net_io.bytes_sent,
-            'bytes_recv': net_io.bytes_recv,
-            'packets_sent': net_io.packets_sent,
-            'packets_recv': net_io.packets_recv,
-            'connections': connections
+            'bytes_sent': sum(t['tx_bytes'] for t in totals.values()),
+            'bytes_recv': sum(t['rx_bytes'] for t in totals.values()),
+            'packets_sent': sum(t['tx_packets'] for t in totals.values()),
+            'packets_recv': sum(t['rx_packets'] for t in totals.values()),
+            'connections': sockets['total'],
+            'sockets': sockets,
+            'interfaces': rates
         }
     
     def get_process_info(self):
         """Get top processes by CPU and memory"""
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            try:
-                processes.append(proc.info)
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
-        
-        # Sort by CPU usage
-        top_cpu = sorted(processes, key=lambda x: x['cpu_percent'], reverse=True)[:5]
-        # Sort by memory usage
-        top_mem = sorted(processes, key=lambda x: x['memory_percent'], reverse=True)[:5]
+        total = self.process_cache.refresh()
+        
+        return {
+            'total': total,
+            'top_cpu': self.process_cache.top('cpu_percent', 5),
+            'top_memory': self.process_cache.top('memory_percent', 5)
+        }
+    
+    def get_service_info(self):
+        """Get per-service and per-container usage from cgroup accounting"""
+        units = self.cgroup_accounting.sample()
         
         return {
-            'total': len(processes),
-            'top_cpu': top_cpu,
-            'top_memory': top_mem
+            'total': len(units),
+            'units': units,
+            'top_cpu': self.cgroup_accounting.top('cpu_percent', 5),
+            'top_memory': self.cgroup_accounting.top('memory_bytes', 5)
         }
     
     def check_thresholds(self, stats):
         """Check if any thresholds are exceeded"""
         alerts = []
         
-        if stats['cpu']['percent'] > self.config['cpu_threshold']:
-            alerts.append(f"CPU usage high: {stats['cpu']['percent']:.1f}%")
+        # With an alert window, CPU alerts on the sustained mean rather
+        # than a single sample
+        cpu_percent = stats['cpu']['percent']
+        alert_window = self.config.get('alert_window', 0)
+        if alert_window:
+            cpu_window = self.history.stats('cpu', alert_window, percentiles=())
+            if cpu_window:
+                cpu_percent = cpu_window['mean']
+        if cpu_percent > self.config['cpu_threshold']:
+            alerts.append(f"CPU usage high: {cpu_percent:.1f}%")
         
         if stats['memory']['percent'] > self.config['memory_threshold']:
             alerts.append(f"Memory usage high: {stats['memory']['percent']:.1f}%")
@@ -192,89 +416,139 @@ class SystemMonitor:
     
     def display_dashboard(self, stats):
         """Display real-time dashboard"""
-        os.system('clear' if os.name != 'nt' else 'cls')
+        lines = []
+        out = lines.append
         
-        print(f"{Colors.CYAN}{Colors.BOLD}╔═══════════════════════════════════════════════════╗{Colors.END}")
-        print(f"{Colors.CYAN}{Colors.BOLD}║     SentinelX System Health Monitor v{VERSION}      ║{Colors.END}")
-        print(f"{Colors.CYAN}{Colors.BOLD}╚═══════════════════════════════════════════════════╝{Colors.END}")
-        print()
+        out(f"{Colors.CYAN}{Colors.BOLD}╔═══════════════════════════════════════════════════╗{Colors.END}")
+        out(f"{Colors.CYAN}{Colors.BOLD}║     SentinelX System Health Monitor v{VERSION}      ║{Colors.END}")
+        out(f"{Colors.CYAN}{Colors.BOLD}╚═══════════════════════════════════════════════════╝{Colors.END}")
+        out("")
         
         # CPU
         cpu_color = self._get_color(stats['cpu']['percent'], self.config['cpu_threshold'])
-        print(f"{Colors.BOLD}CPU:{Colors.END}")
-        print(f"  Usage: {cpu_color}{stats['cpu']['percent']:.1f}%{Colors.END} "
-              f"({stats['cpu']['count']} cores @ {stats['cpu']['freq_current']:.0f} MHz)")
+        out(f"{Colors.BOLD}CPU:{Colors.END}")
+        out(f"  Usage: {cpu_color}{stats['cpu']['percent']:.1f}%{Colors.END} "
+            f"({stats['cpu']['count']} cores @ {stats['cpu']['freq_current']:.0f} MHz)")
+        cpu_window = self.history.stats('cpu', 300)
+        if cpu_window and cpu_window['samples'] > 1:
+            out(f"  5 min: avg {cpu_window['mean']:.1f}% | "
+                f"p95 {cpu_window['p95']:.1f}% | max {cpu_window['max']:.1f}%")
         
-        # Per-CPU usage bar
-        print("  Cores: ", end="")
-        for i, usage in enumerate(stats['cpu']['per_cpu']):
-            bar = self._create_bar(usage, 10)
-            print(f"[{bar}] ", end="")
-            if (i + 1) % 4 == 0:
-                print("\n         ", end="")
-        print()
+        # Per-CPU usage bars, four per row
+        bars = [f"[{self._create_bar(usage, 10)}]" for usage in stats['cpu']['per_cpu']]
+        for i in range(0, len(bars), 4):
+            prefix = "  Cores: " if i == 0 else "         "
+            out(prefix + " ".join(bars[i:i + 4]))
         
         # Memory
         mem_color = self._get_color(stats['memory']['percent'], self.config['memory_threshold'])
         mem_used_gb = stats['memory']['used'] / (1024**3)
         mem_total_gb = stats['memory']['total'] / (1024**3)
-        print(f"\n{Colors.BOLD}Memory:{Colors.END}")
-        print(f"  RAM:  {mem_color}{stats['memory']['percent']:.1f}%{Colors.END} "
-              f"({mem_used_gb:.1f} GB / {mem_total_gb:.1f} GB)")
+        out("")
+        out(f"{Colors.BOLD}Memory:{Colors.END}")
+        out(f"  RAM:  {mem_color}{stats['memory']['percent']:.1f}%{Colors.END} "
+            f"({mem_used_gb:.1f} GB / {mem_total_gb:.1f} GB)")
         if stats['memory']['swap_total'] > 0:
             swap_used_gb = stats['memory']['swap_used'] / (1024**3)
             swap_total_gb = stats['memory']['swap_total'] / (1024**3)
-            print(f"  Swap: {stats['memory']['swap_percent']:.1f}% "
-                  f"({swap_used_gb:.1f} GB / {swap_total_gb:.1f} GB)")
+            out(f"  Swap: {stats['memory']['swap_percent']:.1f}% "
+                f"({swap_used_gb:.1f} GB / {swap_total_gb:.1f} GB)")
         
         # Disk
-        print(f"\n{Colors.BOLD}Disk:{Colors.END}")
+        out("")
+        out(f"{Colors.BOLD}Disk:{Colors.END}")
         for mount, disk in stats['disk'].items():
             disk_color = self._get_color(disk['percent'], self.config['disk_threshold'])
             disk_used_gb = disk['used'] / (1024**3)
             disk_total_gb = disk['total'] / (1024**3)
-            print(f"  {mount}: {disk_color}{disk['percent']:.1f}%{Colors.END} "
-                  f"({disk_used_gb:.1f} GB / {disk_total_gb:.1f} GB)")
+            stale = " (stale)" if disk['stale'] else ""
+            io = ""
+            if disk['io']:
+                io = (f" | R {disk['io']['read_bytes_per_sec'] / 1024**2:.1f} MB/s"
+                      f" W {disk['io']['write_bytes_per_sec'] / 1024**2:.1f} MB/s")
+            out(f"  {mount}: {disk_color}{disk['percent']:.1f}%{Colors.END} "
+                f"({disk_used_gb:.1f} GB / {disk_total_gb:.1f} GB){io}{stale}")
         
         # Temperature
         if stats['temperature']['current'] > 0:
             temp_color = self._get_color(stats['temperature']['current'], 
                                          self.config['temperature_threshold'])
-            print(f"\n{Colors.BOLD}Temperature:{Colors.END}")
-            print(f"  CPU: {temp_color}{stats['temperature']['current']:.1f}°C{Colors.END}")
+            out("")
+            out(f"{Colors.BOLD}Temperature:{Colors.END}")
+            out(f"  CPU: {temp_color}{stats['temperature']['current']:.1f}°C{Colors.END}")
         
         # Network
-        print(f"\n{Colors.BOLD}Network:{Colors.END}")
+        out("")
+        out(f"{Colors.BOLD}Network:{Colors.END}")
         sent_mb = stats['network']['bytes_sent'] / (1024**2)
         recv_mb = stats['network']['bytes_recv'] / (1024**2)
-        print(f"  Sent:     {sent_mb:.1f} MB")
-        print(f"  Received: {recv_mb:.1f} MB")
-        print(f"  Active Connections: {stats['network']['connections']}")
+        out(f"  Sent:     {sent_mb:.1f} MB")
+        out(f"  Received: {recv_mb:.1f} MB")
+        busiest = sorted(stats['network']['interfaces'].items(),
+                         key=lambda x: -(x[1]['rx_bytes'] + x[1]['tx_bytes']))
+        for iface, rate in busiest[:4]:
+            faults = rate['rx_errors'] + rate['tx_errors'] + rate['rx_drops'] + rate['tx_drops']
+            fault_color = Colors.RED if faults else ""
+            out(f"  {iface:<10} RX {rate['rx_bytes'] / 1024**2:7.2f} MB/s {rate['rx_packets']:8.0f} pkt/s"
+                f" | TX {rate['tx_bytes'] / 1024**2:7.2f} MB/s {rate['tx_packets']:8.0f} pkt/s"
+                f" | {fault_color}err {rate['rx_errors'] + rate['tx_errors']:.1f}/s"
+                f" drop {rate['rx_drops'] + rate['tx_drops']:.1f}/s{Colors.END if faults else ''}")
+        sockets = stats['network']['sockets']
+        out(f"  Active Connections: {sockets['total']} "
+            f"(TCP {sockets['tcp']}, TIME_WAIT {sockets['tcp_time_wait']}, UDP {sockets['udp']})")
+        if sockets.get('tcp_states'):
+            out("  TCP States: " + ", ".join(
+                f"{state} {count}" for state, count in
+                sorted(sockets['tcp_states'].items(), key=lambda x: -x[1])[:4]))
         
         # Top processes
-        print(f"\n{Colors.BOLD}Top CPU Processes:{Colors.END}")
+        out("")
+        out(f"{Colors.BOLD}Top CPU Processes:{Colors.END}")
         for proc in stats['processes']['top_cpu'][:3]:
-            print(f"  {proc['name']:<20} {proc['cpu_percent']:>6.1f}% CPU")
+            out(f"  {proc['name']:<20} {proc['cpu_percent']:>6.1f}% CPU")
         
-        print(f"\n{Colors.BOLD}Top Memory Processes:{Colors.END}")
+        out("")
+        out(f"{Colors.BOLD}Top Memory Processes:{Colors.END}")
         for proc in stats['processes']['top_memory'][:3]:
-            print(f"  {proc['name']:<20} {proc['memory_percent']:>6.1f}% MEM")
+            out(f"  {proc['name']:<20} {proc['memory_percent']:>6.1f}% MEM")
+        
+        # Top services (cgroup v2 only)
+        if stats['services']['total']:
+            out("")
+            out(f"{Colors.BOLD}Top Services:{Colors.END}")
+            for unit in stats['services']['top_cpu'][:5]:
+                out(f"  {unit['unit'][:28]:<28} {unit['cpu_percent']:>6.1f}% CPU "
+                    f"{unit['memory_bytes'] / 1024**2:>8.1f} MB "
+                    f"| R {unit['io_read_bytes_per_sec'] / 1024**2:.1f} MB/s"
+                    f" W {unit['io_write_bytes_per_sec'] / 1024**2:.1f} MB/s")
         
         # Alerts
         alerts = self.check_thresholds(stats)
         if alerts:
-            print(f"\n{Colors.RED}{Colors.BOLD}⚠ ALERTS:{Colors.END}")
+            out("")
+            out(f"{Colors.RED}{Colors.BOLD}⚠ ALERTS:{Colors.END}")
             for alert in alerts:
-                print(f"  {Colors.RED}• {alert}{Colors.END}")
+                out(f"  {Colors.RED}• {alert}{Colors.END}")
             self.alerts_triggered += len(alerts)
         
         # Stats
         uptime = time.time() - self.start_time
-        print(f"\n{Colors.BOLD}Monitor Stats:{Colors.END}")
-        print(f"  Uptime: {int(uptime)}s | Alerts: {self.alerts_triggered} | "
-              f"Interval: {self.config['check_interval']}s")
+        out("")
+        out(f"{Colors.BOLD}Monitor Stats:{Colors.END}")
+        out(f"  Uptime: {int(uptime)}s | Alerts: {self.alerts_triggered} | "
+            f"Interval: {self.config['check_interval']}s")
+        
+        # Collector cost overlay
+        if self.self_stats:
+            out("")
+            out(f"{Colors.BOLD}Monitor Overhead:{Colors.END}")
+            for line in self.collector_stats.overlay():
+                out(f"  {line}")
+        
+        out("")
+        out(f"{Colors.CYAN}Press Ctrl+C to exit{Colors.END}")
         
-        print(f"\n{Colors.CYAN}Press Ctrl+C to exit{Colors.END}")
+        self.renderer.render(lines)
     
     def _get_color(self, value, threshold):
         """Get color based on value and threshold"""
@@ -292,23 +566,123 @@ class SystemMonitor:
     
     def collect_stats(self):
         """Collect all system statistics"""
+        measure = self.collector_stats.measure
         stats = {
             'timestamp': datetime.now().isoformat(),
-            'cpu': self.get_cpu_info(),
-            'memory': self.get_memory_info(),
-            'disk': self.get_disk_info(),
-            'temperature': self.get_temperature(),
-            'network': self.get_network_info(),
-            'processes': self.get_process_info()
+            'cpu': measure('cpu', self.get_cpu_info),
+            'memory': measure('memory', self.get_memory_info),
+            'disk': measure('disk', self.get_disk_info),
+            'temperature': measure('temperature', self.get_temperature),
+            'network': measure('network', self.get_network_info),
+            'processes': measure('processes', self.get_process_info),
+            'services': measure('services', self.get_service_info)
         }
         
-        # Update history
-        self.history['cpu'].append(stats['cpu']['percent'])
-        self.history['memory'].append(stats['memory']['percent'])
-        self.history['temp'].append(stats['temperature']['current'])
+        measure('history', self.record_history, stats)
         
         return stats
     
+    def record_history(self, stats):
+        """Append the current sample to the time-series store"""
+        now = time.time()
+        record = self.history.record
+        
+        record('cpu', stats['cpu']['percent'], now)
+        for i, usage in enumerate(stats['cpu']['per_cpu']):
+            record(f'cpu.core{i}', usage, now)
+        record('memory', stats['memory']['percent'], now)
+        record('swap', stats['memory']['swap_percent'], now)
+        for mount, disk in stats['disk'].items():
+            record(f'disk.{mount}', disk['percent'], now)
+        record('temp', stats['temperature']['current'], now)
+        for sensor, current in stats['temperature'].get('sensors', {}).items():
+            record(f'temp.{sensor}', current, now)
+        for iface, rates in stats['network']['interfaces'].items():
+            for field, rate in rates.items():
+                record(f'net.{iface}.{field}', rate, now)
+    
+    def render_metrics(self, stats):
+        """Render collected stats in the text exposition format"""
+        w = MetricsWriter()
+        cpu, mem, net = stats['cpu'], stats['memory'], stats['network']
+        w.family("sx_cpu_usage_percent", "gauge", "Total CPU utilisation",
+                 [({}, cpu['percent'])])
+        w.family("sx_cpu_core_usage_percent", "gauge", "Per-core CPU utilisation",
+                 [({'core': i}, usage) for i, usage in enumerate(cpu['per_cpu'])])
+        w.family("sx_cpu_frequency_mhz", "gauge", "Current CPU frequency",
+                 [({}, cpu['freq_current'])])
+        w.family("sx_memory_usage_percent", "gauge", "RAM utilisation",
+                 [({}, mem['percent'])])
+        w.family("sx_memory_used_bytes", "gauge", "RAM in use",
+                 [({}, mem['used'])])
+        w.family("sx_memory_total_bytes", "gauge", "Total RAM",
+                 [({}, mem['total'])])
+        w.family("sx_swap_usage_percent", "gauge", "Swap utilisation",
+                 [({}, mem['swap_percent'])])
+        w.family("sx_disk_usage_percent", "gauge", "Filesystem utilisation",
+                 [({'mountpoint': m, 'device': d['device']}, d['percent'])
+                  for m, d in stats['disk'].items()])
+        w.family("sx_disk_used_bytes", "gauge", "Filesystem space in use",
+                 [({'mountpoint': m, 'device': d['device']}, d['used'])
+                  for m, d in stats['disk'].items()])
+        w.family("sx_temperature_celsius", "gauge", "CPU temperature",
+                 [({}, stats['temperature']['current'])])
+        w.family("sx_network_sent_bytes_total", "counter", "Bytes sent on all interfaces",
+                 [({}, net['bytes_sent'])])
+        w.family("sx_network_received_bytes_total", "counter", "Bytes received on all interfaces",
+                 [({}, net['bytes_recv'])])
+        for field, help_text in NETWORK_RATE_FAMILIES:
+            w.family(f"sx_network_{field}_per_second", "gauge", help_text,
+                     [({'interface': iface}, rates[field])
+                      for iface, rates in net['interfaces'].items()])
+        w.family("sx_network_connections", "gauge", "Open inet sockets",
+                 [({}, net['connections'])])
+        w.family("sx_network_sockets", "gauge", "Sockets by protocol",
+                 [({'protocol': proto}, net['sockets'][proto])
+                  for proto in ('tcp', 'tcp_time_wait', 'tcp_orphan', 'udp', 'raw')])
+        w.family("sx_network_tcp_state_sockets", "gauge", "TCP sockets by state",
+                 [({'state': state}, count)
+                  for state, count in net['sockets'].get('tcp_states', {}).items()])
+        w.family("sx_processes", "gauge", "Number of processes",
+                 [({}, stats['processes']['total'])])
+        units = stats['services']['units']
+        w.family("sx_service_cpu_usage_percent", "gauge", "CPU used by a systemd unit's cgroup",
+                 [({'unit': u['cgroup']}, u['cpu_percent']) for u in units])
+        w.family("sx_service_memory_bytes", "gauge", "Memory charged to a systemd unit's cgroup",
+                 [({'unit': u['cgroup']}, u['memory_bytes']) for u in units])
+        w.family("sx_service_io_read_bytes_per_second", "gauge", "Bytes read by a systemd unit's cgroup",
+                 [({'unit': u['cgroup']}, u['io_read_bytes_per_sec']) for u in units])
+        w.family("sx_service_io_write_bytes_per_second", "gauge", "Bytes written by a systemd unit's cgroup",
+                 [({'unit': u['cgroup']}, u['io_write_bytes_per_sec']) for u in units])
+        w.family("sx_monitor_alerts_total", "counter", "Alerts raised by this monitor",
+                 [({}, self.alerts_triggered)])
+        self.collector_stats.render(w)
+        w.family("sx_monitor_last_collect_timestamp_seconds", "gauge",
+                 "Unix time of the last collection", [({}, f"{time.time():.3f}")])
+        return w.render()
+    
+    def run_headless(self, host="127.0.0.1", port=DEFAULT_METRICS_PORT):
+        """Collect without a dashboard and serve metrics over HTTP"""
+        server = MetricsServer(host, port)
+        server.start()
+        bound_host, bound_port = server.address
+        print(f"Serving metrics on http://{bound_host}:{bound_port}/metrics")
+        self.log_event(f"Headless monitor started on {bound_host}:{bound_port}", "INFO")
+        
+        try:
+            while True:
+                stats = self.collect_stats()
+                alerts = self.check_thresholds(stats)
+                self.alerts_triggered += len(alerts)
+                for alert in alerts:
+                    self.log_event(alert, "WARNING")
+                server.publish(self.render_metrics(stats))
+                time.sleep(self.config['check_interval'])
+        except KeyboardInterrupt:
+            self.log_event("Headless monitor stopped", "INFO")
+        finally:
+            server.stop()
+    
     def run(self):
         """Main monitoring loop"""
         print(f"{Colors.GREEN}Starting SentinelX System Monitor...{Colors.END}")
@@ -336,6 +710,224 @@ class SystemMonitor:
         except Exception as e:
             print(f"\n{Colors.RED}Error: {e}{Colors.END}")
             self.log_event(f"Error: {e}", "ERROR")
+        
+        finally:
+            self.renderer.close()
+
+def benchmark_processes(extra_counts=(0, 500, 2000), ticks=5):
+    """Measure per-tick process collection cost against PID count
+
+    Spawns idle `sleep` children to inflate the process table and compares
+    a full process_iter() scan plus two sorts (the old collector) with a
+    warm ProcessCache refresh and bounded top-N selection.
+    """
+    print(f"{'PIDs':>8} {'full scan (ms)':>16} {'cache (ms)':>12}")
+    children = []
+    try:
+        for target in extra_counts:
+            while len(children) < target:
+                children.append(subprocess.Popen(['sleep', '600']))
+            
+            start = time.perf_counter()
+            for _ in range(ticks):
+                processes = [p.info for p in psutil.process_iter(
+                    ['pid', 'name', 'cpu_percent', 'memory_percent'])]
+                sorted(processes, key=lambda x: x['cpu_percent'] or 0, reverse=True)[:5]
+                sorted(processes, key=lambda x: x['memory_percent'] or 0, reverse=True)[:5]
+            full_ms = (time.perf_counter() - start) / ticks * 1000
+            
+            cache = ProcessCache()
+            cache.refresh()
+            start = time.perf_counter()
+            for _ in range(ticks):
+                count = cache.refresh()
+                cache.top('cpu_percent', 5)
+                cache.top('memory_percent', 5)
+            cache_ms = (time.perf_counter() - start) / ticks * 1000
+            
+            print(f"{count:>8} {full_ms:>16.2f} {cache_ms:>12.2f}")
+    finally:
+        for child in children:
+            child.kill()
+        for child in children:
+            child.wait()
+
+def benchmark_connections(counts=(0, 1000, 5000), ticks=5):
+    """Measure connection counting cost against open socket count
+
+    Opens loopback TCP connection pairs and compares psutil.net_connections()
+    (the old collector) with the sockstat totals and the sock_diag state dump.
+    """
+    print(f"{'sockets':>8} {'psutil (ms)':>12} {'sockstat (ms)':>14} {'states (ms)':>12}")
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1024)
+    sockets = []
+    summary = ConnectionSummary()
+    
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(ticks):
+            fn()
+        return (time.perf_counter() - start) / ticks * 1000
+    
+    try:
+        for target in counts:
+            while len(sockets) < target * 2:
+                client = socket.create_connection(listener.getsockname())
+                sockets.append(client)
+                sockets.append(listener.accept()[0])
+            
+            legacy_ms = timed(lambda: len(psutil.net_connections()))
+            sockstat_ms = timed(lambda: summary.collect(states=False))
+            states_ms = timed(lambda: summary.collect(states=True))
+            total = summary.collect(states=False)['total']
+            print(f"{total:>8} {legacy_ms:>12.2f} {sockstat_ms:>14.2f} {states_ms:>12.2f}")
+    finally:
+        for sock in sockets:
+            sock.close()
+        listener.close()
+
+def build_fixtures(root, pids=10000, interfaces=500, mounts=100, units=300, cpus=64):
+    """Write synthetic /proc and /sys trees under root for the collectors
+
+    Only the files the collectors parse are created, in the kernel's
+    format, so each collector can be pointed at the tree through its
+    path parameter. Returns the keyword paths for each collector.
+    """
+    proc = os.path.join(root, 'proc')
+    for pid in range(1, pids + 1):
+        os.makedirs(f"{proc}/{pid}")
+        with open(f"{proc}/{pid}/stat", 'w') as f:
+            # pid (comm) state ppid ... utime(14) stime(15) ... starttime(22) vsize rss(24)
+            f.write(f"{pid} (worker {pid % 97}) S 1 {pid} {pid} 0 -1 4194560 "
+                    f"{pid % 5000} 0 0 0 {pid * 3} {pid} 0 0 20 0 1 0 {1000 + pid} "
+                    f"{pid * 4096 * 64} {pid % 4096 + 64} 18446744073709551615\n")
+    
+    with open(f"{proc}/stat", 'w') as f:
+        f.write("cpu  " + " ".join(str(v * cpus) for v in (4705, 150, 1120, 16250, 520, 0, 24, 0, 0, 0)) + "\n")
+        for cpu in range(cpus):
+            f.write(f"cpu{cpu} 4705 150 1120 16250 520 0 24 0 0 0\n")
+        f.write("intr 0\nctxt 0\nbtime 0\n")
+    
+    os.makedirs(f"{proc}/net")
+    with open(f"{proc}/net/dev", 'w') as f:
+        f.write("Inter-|   Receive                                                |  Transmit\n"
+                " face |bytes    packets errs drop fifo frame compressed multicast|"
+                "bytes    packets errs drop fifo colls carrier compressed\n")
+        for i in range(interfaces):
+            f.write(f"  veth{i:04x}: {i * 1048576} {i * 900} 0 0 0 0 0 0 "
+                    f"{i * 524288} {i * 450} 0 0 0 0 0 0\n")
+    with open(f"{proc}/net/sockstat", 'w') as f:
+        f.write("sockets: used 4096\nTCP: inuse 2000 orphan 3 tw 150 alloc 2100 mem 64\n"
+                "UDP: inuse 40 mem 8\nUDPLITE: inuse 0\nRAW: inuse 1\nFRAG: inuse 0 memory 0\n")
+    with open(f"{proc}/net/sockstat6", 'w') as f:
+        f.write("TCP6: inuse 500\nUDP6: inuse 20\nUDPLITE6: inuse 0\nRAW6: inuse 0\nFRAG6: inuse 0 memory 0\n")
+    
+    mnt = os.path.join(root, 'mnt')
+    with open(f"{proc}/mountinfo", 'w') as f:
+        for i in range(mounts):
+            os.makedirs(f"{mnt}/vol{i}")
+            f.write(f"{100 + i} 1 8:{i} / {mnt}/vol{i} rw,relatime shared:{i} - "
+                    f"ext4 /dev/sd{chr(97 + i % 26)}{i} rw\n")
+    
+    cgroup = os.path.join(root, 'cgroup')
+    os.makedirs(cgroup)
+    open(f"{cgroup}/cgroup.controllers", 'w').write("cpu io memory pids\n")
+    for i in range(units):
+        parent = "system.slice" if i % 3 else f"user.slice/user-{i}.slice"
+        path = f"{cgroup}/{parent}/unit{i}.service"
+        os.makedirs(path)
+        with open(f"{path}/cpu.stat", 'w') as f:
+            f.write(f"usage_usec {i * 1000}\nuser_usec {i * 600}\nsystem_usec {i * 400}\n")
+        with open(f"{path}/memory.current", 'w') as f:
+            f.write(f"{i * 1048576}\n")
+        with open(f"{path}/io.stat", 'w') as f:
+            f.write(f"8:0 rbytes={i * 4096} wbytes={i * 8192} rios={i} wios={i} dbytes=0 dios=0\n")
+    
+    return {
+        'proc_root': proc,
+        'stat_path': f"{proc}/stat",
+        'dev_path': f"{proc}/net/dev",
+        'proc_net': f"{proc}/net",
+        'mountinfo': f"{proc}/mountinfo",
+        'cgroup_root': cgroup
+    }
+
+def benchmark_fixtures(ticks=20, output=None, baseline=None, threshold=25.0, **scale):
+    """Time every file-backed collector against synthetic fixtures
+
+    Builds a fixture tree (10k PIDs, 500 interfaces, 100 mounts by
+    default), runs each collector `ticks` times after a warm-up call and
+    reports the median, p95 and worst tick plus the peak allocation of a
+    traced run. Results can be written as JSON and compared against a
+    previous run; returns False when a collector's median regressed by
+    more than `threshold` percent.
+    """
+    root = tempfile.mkdtemp(prefix='sx-monitor-fixtures-')
+    try:
+        start = time.perf_counter()
+        paths = build_fixtures(root, **scale)
+        print(f"Fixtures built in {time.perf_counter() - start:.1f}s under {root}")
+        
+        processes = ProcessCache(paths['proc_root'])
+        disks = DiskInventory(paths['mountinfo'])
+        connections = ConnectionSummary(paths['proc_net'])
+        collectors = {
+            'processes': lambda: (processes.refresh(),
+                                  processes.top('cpu_percent', 5),
+                                  processes.top('memory_percent', 5)),
+            'cpu': CpuSampler(paths['stat_path']).sample,
+            'network': NetDevSampler(paths['dev_path']).sample,
+            'connections': lambda: connections.collect(states=False),
+            'disk': disks.usage,
+            'services': CgroupAccounting(paths['cgroup_root']).sample
+        }
+        
+        results = {}
+        for name, collect in collectors.items():
+            collect()
+            durations = []
+            for _ in range(ticks):
+                started = time.perf_counter()
+                collect()
+                durations.append(time.perf_counter() - started)
+            durations.sort()
+            tracemalloc.start()
+            collect()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[name] = {
+                'p50_ms': round(durations[len(durations) // 2] * 1000, 3),
+                'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000, 3),
+                'max_ms': round(durations[-1] * 1000, 3),
+                'peak_kb': round(peak / 1024, 1)
+            }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    
+    previous = {}
+    if baseline:
+        with open(baseline) as f:
+            previous = json.load(f).get('collectors', {})
+    
+    ok = True
+    print(f"{'collector':<12} {'p50 (ms)':>10} {'p95 (ms)':>10} {'max (ms)':>10} {'peak (KB)':>10}  baseline")
+    for name, r in results.items():
+        note = ""
+        if name in previous:
+            change = (r['p50_ms'] / previous[name]['p50_ms'] - 1) * 100 if previous[name]['p50_ms'] else 0.0
+            note = f"{change:+.1f}%"
+            if change > threshold:
+                note += " REGRESSION"
+                ok = False
+        print(f"{name:<12} {r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} {r['max_ms']:>10.3f} {r['peak_kb']:>10.1f}  {note}")
+    
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'ticks': ticks, 'scale': scale, 'collectors': results}, f, indent=2)
+        print(f"Results written to {output}")
+    return ok
 
 def load_config():
     """Load configuration from file"""
@@ -357,15 +949,43 @@ def main():
     )
     
     parser.add_argument('-v', '--version', action='version', version=f'sx-monitor v{VERSION}')
-    parser.add_argument('-i', '--interval', type=int, help='Check interval in seconds')
-    parser.add_argument('--cpu-threshold', type=float, help='CPU usage threshold (%)')
-    parser.add_argument('--mem-threshold', type=float, help='Memory usage threshold (%)')
-    parser.add_argument('--disk-threshold', type=float, help='Disk usage threshold (%)')
+    parser.add_argument('-i', '--interval', type=float,
+                        help='Check interval in seconds (fractions allowed, e.g. 0.25)')
+    parser.add_argument('--cpu-threshold', type=float, help='CPU usage threshold (%%)')
+    parser.add_argument('--mem-threshold', type=float, help='Memory usage threshold (%%)')
+    parser.add_argument('--disk-threshold', type=float, help='Disk usage threshold (%%)')
     parser.add_argument('--no-alerts', action='store_true', help='Disable alerts')
     parser.add_argument('--no-log', action='store_true', help='Disable logging')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Run headless and serve metrics over HTTP')
+    parser.add_argument('--listen', default=f'127.0.0.1:{DEFAULT_METRICS_PORT}',
+                        help='HOST:PORT for the metrics endpoint (with --daemon)')
+    parser.add_argument('--self-stats', action='store_true',
+                        help='Show what each collector costs on the dashboard')
+    parser.add_argument('--trace-alloc', action='store_true',
+                        help='Attribute memory allocations to collectors (slower)')
+    parser.add_argument('--benchmark', choices=['processes', 'connections', 'fixtures'],
+                        help='Run a collector benchmark and exit')
+    parser.add_argument('--benchmark-output', metavar='FILE',
+                        help='Write fixture benchmark results as JSON')
+    parser.add_argument('--benchmark-baseline', metavar='FILE',
+                        help='Compare fixture benchmark results against a previous run')
+    parser.add_argument('--benchmark-threshold', type=float, default=25.0,
+                        help='Median slowdown (%%) reported as a regression (default: 25)')
     
     args = parser.parse_args()
     
+    if args.benchmark == 'processes':
+        benchmark_processes()
+        return
+    if args.benchmark == 'connections':
+        benchmark_connections()
+        return
+    if args.benchmark == 'fixtures':
+        ok = benchmark_fixtures(output=args.benchmark_output, baseline=args.benchmark_baseline,
+                                threshold=args.benchmark_threshold)
+        sys.exit(0 if ok else 1)
+    
     # Load config
     config = load_config()
     
@@ -387,8 +1007,11 @@ def main():
     save_config(config)
     
     # Run monitor
-    monitor = SystemMonitor(config)
-    monitor.run()
+    monitor = SystemMonitor(config, self_stats=args.self_stats, trace_alloc=args.trace_alloc)
+    if args.daemon:
+        monitor.run_headless(*parse_listen(args.listen))
+    else:
+        monitor.run()
 
 if __name__ == "__main__":
     main()
@@ -7,38 +7,181 @@ Real-time monitoring dashboard for SentinelX OS
 import os
 import sys
 import time
-import psutil
 import json
+import argparse
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+# Shared components live in /usr/lib/sentinelx once installed; SX_LIB_DIR
+# overrides that, e.g. SX_LIB_DIR=tools when running from a checkout
+sys.path.insert(1, os.environ.get("SX_LIB_DIR", "/usr/lib/sentinelx"))
+from sx_common import (
+    DEFAULT_METRICS_PORT, CgroupAccounting, CollectorStats, ConnectionSummary,
+    DiskInventory, MetricsServer, MetricsWriter, NetDevSampler, ProcessCache,
+    SnapshotFile, TerminalRenderer, _LazyModule, parse_listen, psutil
+)
+
+asyncio = _LazyModule("asyncio")
+
+REPORT_DIR = Path("/var/log/sentinelx")
+SNAPSHOT_FILE = "/run/sentinelx/sx-monitor.snap"
+SNAPSHOT_MAX_AGE = 30  # seconds; older snapshots mean the daemon is stuck
+
+# Per-interface rate families exported on the metrics endpoint
+NETWORK_RATE_FAMILIES = (
+    ('rx_bytes', "Bytes received per interface"),
+    ('tx_bytes', "Bytes sent per interface"),
+    ('rx_packets', "Packets received per interface"),
+    ('tx_packets', "Packets sent per interface"),
+    ('rx_errors', "Receive errors per interface"),
+    ('tx_errors', "Transmit errors per interface"),
+    ('rx_drops', "Received packets dropped per interface"),
+    ('tx_drops', "Transmitted packets dropped per interface"),
+)
+
+class CollectorScheduler:
+    """Runs collectors concurrently, each on its own refresh cadence
+
+    Every source runs in a worker thread so a slow one (a hung mount, a
+    slow aa-status) never delays the others. Consumers read the latest
+    snapshot instead of waiting on a collection.
+    """
+    
+    def __init__(self, sources):
+        # name -> (callable, interval in seconds or None to run once)
+        self.sources = sources
+        self.snapshot = {}
+        self.updated = {}
+        self.errors = {}
+        self._executor = None
+        self._tasks = []
+    
+    async def _run_source(self, name, func, interval):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            try:
+                self.snapshot[name] = await loop.run_in_executor(self._executor, func)
+                self.updated[name] = time.time()
+                self.errors.pop(name, None)
+            except Exception as e:
+                self.errors[name] = str(e)
+            if interval is None:
+                return
+            await asyncio.sleep(max(0.0, interval - (loop.time() - started)))
+    
+    async def start(self):
+        """Start one task per source"""
+        self._executor = ThreadPoolExecutor(max_workers=len(self.sources),
+                                            thread_name_prefix="sx-collector")
+        self._tasks = [
+            asyncio.create_task(self._run_source(name, func, interval))
+            for name, (func, interval) in self.sources.items()
+        ]
+    
+    async def wait_ready(self, timeout):
+        """Wait until every source has produced a value or timeout expires"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while len(self.snapshot) < len(self.sources) and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+    
+    async def stop(self):
+        """Cancel all sources; collectors still running are abandoned"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
 class SentinelXMonitor:
-    def __init__(self):
-        self.log_dir = Path("/var/log/sentinelx")
+    # Refresh cadence per collector in seconds (None = collect once)
+    COLLECTOR_INTERVALS = {
+        'cpu': 1.0,
+        'memory': 0.5,
+        'disk': 30.0,
+        'network': 2.0,
+        'processes': 2.0,
+        'services': 2.0,
+        'security': 300.0,
+        'boot_time': None,
+    }
+    
+    def __init__(self, self_stats=False, trace_alloc=False):
+        self.log_dir = REPORT_DIR
         self.config_dir = Path("/etc/sentinelx")
         self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.process_cache = ProcessCache()
+        self.disk_inventory = DiskInventory()
+        self.connection_summary = ConnectionSummary()
+        self.net_sampler = NetDevSampler()
+        self.cgroup_accounting = CgroupAccounting()
+        self.renderer = TerminalRenderer()
+        self.collector_stats = CollectorStats(trace_alloc)
+        self.self_stats = self_stats
         
-    def get_system_info(self):
+        # Prime the CPU counters (psutil's and the per-process ones) so later
+        # non-blocking reads, including a one-shot export, are deltas
+        psutil.cpu_percent(interval=None)
+        psutil.cpu_percent(interval=None, percpu=True)
+        self.process_cache.refresh()
+        self.disk_inventory.io_rates()
+        self.net_sampler.sample()
+        self.cgroup_accounting.sample()
+    
+    def collectors(self):
+        """Return the collector table used by CollectorScheduler"""
+        funcs = {
+            'cpu': self.get_cpu_info,
+            'memory': self.get_memory_info,
+            'disk': self.get_disk_info,
+            'network': self.get_network_info,
+            'processes': self.get_process_info,
+            'services': self.get_service_info,
+            'security': self.check_security_status,
+            'boot_time': self.get_boot_time,
+        }
+        measure = self.collector_stats.measure
+        return {name: (functools.partial(measure, name, func), self.COLLECTOR_INTERVALS[name])
+                for name, func in funcs.items()}
+    
+    def get_boot_time(self):
+        """Get system boot time"""
+        return datetime.fromtimestamp(psutil.boot_time()).isoformat()
+    
+    def get_system_info(self, cpu_interval=None):
         """Gather comprehensive system information"""
+        measure = self.collector_stats.measure
         info = {
             'timestamp': datetime.now().isoformat(),
-            'cpu': self.get_cpu_info(),
-            'memory': self.get_memory_info(),
-            'disk': self.get_disk_info(),
-            'network': self.get_network_info(),
-            'processes': self.get_process_info(),
-            'boot_time': datetime.fromtimestamp(psutil.boot_time()).isoformat()
+            'cpu': measure('cpu', self.get_cpu_info, cpu_interval),
+            'memory': measure('memory', self.get_memory_info),
+            'disk': measure('disk', self.get_disk_info),
+            'network': measure('network', self.get_network_info),
+            'processes': measure('processes', self.get_process_info),
+            'services': measure('services', self.get_service_info),
+            'boot_time': measure('boot_time', self.get_boot_time)
         }
         return info
     
-    def get_cpu_info(self):
-        """Get CPU usage and statistics"""
-        cpu_percent = psutil.cpu_percent(interval=1, percpu=True)
+    def get_cpu_info(self, interval=None):
+        """Get CPU usage and statistics
+
+        Usage is measured since the previous call. One-shot callers pass
+        `interval` to make sure the window is at least that long.
+        """
+        if interval:
+            time.sleep(interval)
+        cpu_percent = psutil.cpu_percent(interval=None, percpu=True)
         cpu_freq = psutil.cpu_freq()
         
         return {
             'usage_per_core': cpu_percent,
-            'usage_total': psutil.cpu_percent(interval=1),
+            'usage_total': psutil.cpu_percent(interval=None),
             'cores_physical': psutil.cpu_count(logical=False),
             'cores_logical': psutil.cpu_count(logical=True),
             'frequency': {
@@ -69,22 +212,19 @@ class SentinelXMonitor:
         }
     
     def get_disk_info(self):
-        """Get disk usage for all partitions"""
+        """Get disk usage for all filesystems and per-device I/O rates"""
         disks = []
-        for partition in psutil.disk_partitions():
-            try:
-                usage = psutil.disk_usage(partition.mountpoint)
-                disks.append({
-                    'device': partition.device,
-                    'mountpoint': partition.mountpoint,
-                    'fstype': partition.fstype,
-                    'total': usage.total,
-                    'used': usage.used,
-                    'free': usage.free,
-                    'percent': usage.percent
-                })
-            except PermissionError:
-                continue
+        for mountpoint, info in self.disk_inventory.usage().items():
+            disks.append({
+                'device': info['device'],
+                'mountpoint': mountpoint,
+                'fstype': info['fstype'],
+                'total': info['total'],
+                'used': info['used'],
+                'free': info['free'],
+                'percent': info['percent'],
+                'stale': info['stale']
+            })
         
         io_counters = psutil.disk_io_counters()
         return {
@@ -94,13 +234,14 @@ class SentinelXMonitor:
                 'write_bytes': io_counters.write_bytes,
                 'read_count': io_counters.read_count,
                 'write_count': io_counters.write_count
-            } if io_counters else {}
+            } if io_counters else {},
+            'devices': self.disk_inventory.io_rates()
         }
     
     def get_network_info(self):
         """Get network statistics"""
-        net_io = psutil.net_io_counters()
-        connections = len(psutil.net_connections())
+        totals, rates = self.net_sampler.sample()
+        sockets = self.connection_summary.collect()
         
         interfaces = {}
         for iface, addrs in psutil.net_if_addrs().items():
@@ -113,34 +254,33 @@ class SentinelXMonitor:
             ]
         
         return {
-            'bytes_sent': net_io.bytes_sent,
-            'bytes_recv': net_io.bytes_recv,
-            'packets_sent': net_io.packets_sent,
-            'packets_recv': net_io.packets_recv,
-            'active_connections': connections,
+            'bytes_sent': sum(t['tx_bytes'] for t in totals.values()),
+            'bytes_recv': sum(t['rx_bytes'] for t in totals.values()),
+            'packets_sent': sum(t['tx_packets'] for t in totals.values()),
+            'packets_recv': sum(t['rx_packets'] for t in totals.values()),
+            'throughput': rates,
+            'active_connections': sockets['total'],
+            'sockets': sockets,
             'interfaces': interfaces
         }
     
     def get_process_info(self):
         """Get process statistics"""
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            try:
-                processes.append({
-                    'pid': proc.info['pid'],
-                    'name': proc.info['name'],
-                    'cpu_percent': proc.info['cpu_percent'],
-                    'memory_percent': proc.info['memory_percent']
-                })
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
+        total = self.process_cache.refresh()
         
-        # Sort by CPU usage and get top 10
-        processes.sort(key=lambda x: x['cpu_percent'] or 0, reverse=True)
+        return {
+            'total': total,
+            'top_cpu': self.process_cache.top('cpu_percent', 10)
+        }
+    
+    def get_service_info(self):
+        """Get per-service and per-container usage from cgroup accounting"""
+        units = self.cgroup_accounting.sample()
         
         return {
-            'total': len(processes),
-            'top_cpu': processes[:10]
+            'total': len(units),
+            'units': units,
+            'top_cpu': self.cgroup_accounting.top('cpu_percent', 10)
         }
     
     def check_security_status(self):
@@ -176,6 +316,106 @@ class SentinelXMonitor:
         except:
             return 'unknown'
     
+    def render_metrics(self, info):
+        """Render a (possibly partial) snapshot in the text exposition format"""
+        w = MetricsWriter()
+        if 'cpu' in info:
+            cpu = info['cpu']
+            w.family("sx_cpu_usage_percent", "gauge", "Total CPU utilisation",
+                     [({}, cpu['usage_total'])])
+            w.family("sx_cpu_core_usage_percent", "gauge", "Per-core CPU utilisation",
+                     [({'core': i}, u) for i, u in enumerate(cpu['usage_per_core'])])
+            w.family("sx_load_average", "gauge", "System load average",
+                     [({'period': p}, v) for p, v in zip(('1m', '5m', '15m'), cpu['load_average'])])
+        if 'memory' in info:
+            mem = info['memory']
+            w.family("sx_memory_usage_percent", "gauge", "RAM utilisation",
+                     [({}, mem['percent'])])
+            w.family("sx_memory_used_bytes", "gauge", "RAM in use", [({}, mem['used'])])
+            w.family("sx_memory_total_bytes", "gauge", "Total RAM", [({}, mem['total'])])
+            w.family("sx_swap_usage_percent", "gauge", "Swap utilisation",
+                     [({}, mem['swap']['percent'])])
+        if 'disk' in info:
+            parts = info['disk']['partitions']
+            w.family("sx_disk_usage_percent", "gauge", "Filesystem utilisation",
+                     [({'mountpoint': d['mountpoint'], 'device': d['device']}, d['percent'])
+                      for d in parts])
+            w.family("sx_disk_used_bytes", "gauge", "Filesystem space in use",
+                     [({'mountpoint': d['mountpoint'], 'device': d['device']}, d['used'])
+                      for d in parts])
+        if 'network' in info:
+            net = info['network']
+            w.family("sx_network_sent_bytes_total", "counter", "Bytes sent on all interfaces",
+                     [({}, net['bytes_sent'])])
+            w.family("sx_network_received_bytes_total", "counter", "Bytes received on all interfaces",
+                     [({}, net['bytes_recv'])])
+            for field, help_text in NETWORK_RATE_FAMILIES:
+                w.family(f"sx_network_{field}_per_second", "gauge", help_text,
+                         [({'interface': iface}, rates[field])
+                          for iface, rates in net['throughput'].items()])
+            w.family("sx_network_connections", "gauge", "Open inet sockets",
+                     [({}, net['active_connections'])])
+            w.family("sx_network_sockets", "gauge", "Sockets by protocol",
+                     [({'protocol': proto}, net['sockets'][proto])
+                      for proto in ('tcp', 'tcp_time_wait', 'tcp_orphan', 'udp', 'raw')])
+            w.family("sx_network_tcp_state_sockets", "gauge", "TCP sockets by state",
+                     [({'state': state}, count)
+                      for state, count in net['sockets']['tcp_states'].items()])
+        if 'processes' in info:
+            w.family("sx_processes", "gauge", "Number of processes",
+                     [({}, info['processes']['total'])])
+        if 'services' in info:
+            units = info['services']['units']
+            w.family("sx_service_cpu_usage_percent", "gauge", "CPU used by a systemd unit's cgroup",
+                     [({'unit': u['cgroup']}, u['cpu_percent']) for u in units])
+            w.family("sx_service_memory_bytes", "gauge", "Memory charged to a systemd unit's cgroup",
+                     [({'unit': u['cgroup']}, u['memory_bytes']) for u in units])
+            w.family("sx_service_io_read_bytes_per_second", "gauge", "Bytes read by a systemd unit's cgroup",
+                     [({'unit': u['cgroup']}, u['io_read_bytes_per_sec']) for u in units])
+            w.family("sx_service_io_write_bytes_per_second", "gauge", "Bytes written by a systemd unit's cgroup",
+                     [({'unit': u['cgroup']}, u['io_write_bytes_per_sec']) for u in units])
+        if 'security' in info:
+            w.family("sx_security_layer_info", "gauge", "Security layer status",
+                     [({'layer': layer, 'status': status}, 1)
+                      for layer, status in info['security'].items()])
+        self.collector_stats.render(w)
+        return w.render()
+    
+    def run_daemon(self, host="127.0.0.1", port=DEFAULT_METRICS_PORT, publish_interval=1.0):
+        """Collect headless and serve metrics over HTTP"""
+        server = MetricsServer(host, port)
+        server.start()
+        bound_host, bound_port = server.address
+        print(f"Serving metrics on http://{bound_host}:{bound_port}/metrics", flush=True)
+        try:
+            asyncio.run(self._daemon_loop(server, publish_interval))
+        finally:
+            server.stop()
+    
+    async def _daemon_loop(self, server, publish_interval):
+        """Re-render the exposition from the scheduler snapshot periodically
+
+        The same snapshot goes to SNAPSHOT_FILE so one-shot commands can
+        read it instead of collecting.
+        """
+        scheduler = CollectorScheduler(self.collectors())
+        await scheduler.start()
+        snapshot = SnapshotFile(SNAPSHOT_FILE)
+        try:
+            while True:
+                server.publish(self.render_metrics(scheduler.snapshot))
+                if snapshot is not None:
+                    try:
+                        snapshot.publish(dict(scheduler.snapshot, timestamp=datetime.now().isoformat()))
+                    except OSError as e:
+                        print(f"Cannot publish snapshot {SNAPSHOT_FILE}: {e}", file=sys.stderr, flush=True)
+                        snapshot = None
+                await asyncio.sleep(publish_interval)
+        finally:
+            if snapshot is not None:
+                snapshot.close()
+            await scheduler.stop()
+    
     def format_bytes(self, bytes_value):
         """Format bytes to human readable format"""
         for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
@@ -184,69 +424,121 @@ class SentinelXMonitor:
             bytes_value /= 1024.0
         return f"{bytes_value:.2f} PB"
     
-    def display_dashboard(self):
+    def display_dashboard(self, refresh=2.0):
         """Display interactive dashboard"""
-        while True:
-            os.system('clear')
-            
-            print("=" * 80)
-            print("  ██████ ▓█████  ███▄    █ ▓█████▓ ██▓ ███▄    █ ▓█████  ██▓    ▒██   ██▒")
-            print("                    SentinelX OS - System Monitor")
-            print("=" * 80)
-            print()
-            
-            info = self.get_system_info()
-            
-            # CPU Information
-            print(f"🔥 CPU Usage: {info['cpu']['usage_total']:.1f}%")
-            print(f"   Cores: {info['cpu']['cores_physical']} physical / {info['cpu']['cores_logical']} logical")
-            print(f"   Load Average: {info['cpu']['load_average'][0]:.2f}, {info['cpu']['load_average'][1]:.2f}, {info['cpu']['load_average'][2]:.2f}")
-            print()
-            
-            # Memory Information
+        asyncio.run(self._dashboard_loop(refresh))
+    
+    async def _dashboard_loop(self, refresh):
+        """Render from the scheduler's latest snapshot every `refresh` seconds"""
+        scheduler = CollectorScheduler(self.collectors())
+        await scheduler.start()
+        try:
+            await scheduler.wait_ready(timeout=refresh)
+            while True:
+                self.render_dashboard(scheduler.snapshot)
+                await asyncio.sleep(refresh)
+        finally:
+            self.renderer.close()
+            await scheduler.stop()
+    
+    def render_dashboard(self, info):
+        """Render one dashboard frame from a (possibly partial) snapshot"""
+        lines = []
+        out = lines.append
+        
+        out("=" * 80)
+        out("  ██████ ▓█████  ███▄    █ ▓█████▓ ██▓ ███▄    █ ▓█████  ██▓    ▒██   ██▒")
+        out("                    SentinelX OS - System Monitor")
+        out("=" * 80)
+        out("")
+        
+        # CPU Information
+        if 'cpu' in info:
+            out(f"🔥 CPU Usage: {info['cpu']['usage_total']:.1f}%")
+            out(f"   Cores: {info['cpu']['cores_physical']} physical / {info['cpu']['cores_logical']} logical")
+            out(f"   Load Average: {info['cpu']['load_average'][0]:.2f}, {info['cpu']['load_average'][1]:.2f}, {info['cpu']['load_average'][2]:.2f}")
+            out("")
+        
+        # Memory Information
+        if 'memory' in info:
             mem = info['memory']
-            print(f"💾 Memory: {mem['percent']:.1f}% used")
-            print(f"   Total: {self.format_bytes(mem['total'])} | Used: {self.format_bytes(mem['used'])} | Free: {self.format_bytes(mem['free'])}")
+            out(f"💾 Memory: {mem['percent']:.1f}% used")
+            out(f"   Total: {self.format_bytes(mem['total'])} | Used: {self.format_bytes(mem['used'])} | Free: {self.format_bytes(mem['free'])}")
             if mem['swap']['total'] > 0:
-                print(f"   Swap: {mem['swap']['percent']:.1f}% ({self.format_bytes(mem['swap']['used'])} / {self.format_bytes(mem['swap']['total'])})")
-            print()
-            
-            # Disk Information
-            print("💿 Disk Usage:")
+                out(f"   Swap: {mem['swap']['percent']:.1f}% ({self.format_bytes(mem['swap']['used'])} / {self.format_bytes(mem['swap']['total'])})")
+            out("")
+        
+        # Disk Information
+        if 'disk' in info:
+            out("💿 Disk Usage:")
             for disk in info['disk']['partitions'][:3]:
-                print(f"   {disk['mountpoint']}: {disk['percent']:.1f}% ({self.format_bytes(disk['used'])} / {self.format_bytes(disk['total'])})")
-            print()
-            
-            # Network Information
+                stale = " (stale)" if disk['stale'] else ""
+                out(f"   {disk['mountpoint']}: {disk['percent']:.1f}% ({self.format_bytes(disk['used'])} / {self.format_bytes(disk['total'])}){stale}")
+            out("")
+        
+        # Network Information
+        if 'network' in info:
             net = info['network']
-            print(f"🌐 Network:")
-            print(f"   Sent: {self.format_bytes(net['bytes_sent'])} | Received: {self.format_bytes(net['bytes_recv'])}")
-            print(f"   Active Connections: {net['active_connections']}")
-            print()
-            
-            # Security Status
-            security = self.check_security_status()
-            print(f"🛡️  Security:")
-            print(f"   AppArmor: {security['apparmor']} | SELinux: {security['selinux']} | Firewall: {security['firewall']}")
-            print()
-            
-            # Top Processes
-            print("📊 Top Processes by CPU:")
+            out(f"🌐 Network:")
+            out(f"   Sent: {self.format_bytes(net['bytes_sent'])} | Received: {self.format_bytes(net['bytes_recv'])}")
+            busiest = sorted(net['throughput'].items(),
+                             key=lambda x: -(x[1]['rx_bytes'] + x[1]['tx_bytes']))
+            for iface, rate in busiest[:4]:
+                out(f"   {iface}: ↓ {self.format_bytes(rate['rx_bytes'])}/s ({rate['rx_packets']:.0f} pkt/s)"
+                    f" ↑ {self.format_bytes(rate['tx_bytes'])}/s ({rate['tx_packets']:.0f} pkt/s)"
+                    f" | err {rate['rx_errors'] + rate['tx_errors']:.1f}/s"
+                    f" drop {rate['rx_drops'] + rate['tx_drops']:.1f}/s")
+            sockets = net['sockets']
+            out(f"   Active Connections: {sockets['total']} (TCP {sockets['tcp']}, "
+                f"TIME_WAIT {sockets['tcp_time_wait']}, UDP {sockets['udp']})")
+            if sockets['tcp_states']:
+                out("   TCP States: " + ", ".join(
+                    f"{state} {count}" for state, count in
+                    sorted(sockets['tcp_states'].items(), key=lambda x: -x[1])[:4]))
+            out("")
+        
+        # Security Status
+        if 'security' in info:
+            security = info['security']
+            out(f"🛡️  Security:")
+            out(f"   AppArmor: {security['apparmor']} | SELinux: {security['selinux']} | Firewall: {security['firewall']}")
+            out("")
+        
+        # Top Processes
+        if 'processes' in info:
+            out("📊 Top Processes by CPU:")
             for proc in info['processes']['top_cpu'][:5]:
-                print(f"   {proc['name'][:20]:20} PID:{proc['pid']:6} CPU:{proc['cpu_percent']:5.1f}% MEM:{proc['memory_percent']:5.1f}%")
-            
-            print()
-            print("=" * 80)
-            print(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | Press Ctrl+C to exit")
-            
-            time.sleep(2)
+                out(f"   {proc['name'][:20]:20} PID:{proc['pid']:6} CPU:{proc['cpu_percent']:5.1f}% MEM:{proc['memory_percent']:5.1f}%")
+            out("")
+        
+        # Top Services (cgroup v2 only)
+        if info.get('services', {}).get('total'):
+            out("🧩 Top Services by CPU:")
+            for unit in info['services']['top_cpu'][:5]:
+                out(f"   {unit['unit'][:28]:28} CPU:{unit['cpu_percent']:5.1f}% "
+                    f"MEM:{self.format_bytes(unit['memory_bytes']):>10} "
+                    f"IO: ↓ {self.format_bytes(unit['io_read_bytes_per_sec'])}/s "
+                    f"↑ {self.format_bytes(unit['io_write_bytes_per_sec'])}/s")
+            out("")
+        
+        # Collector cost overlay
+        if self.self_stats:
+            out("⏱️  Monitor Overhead:")
+            for line in self.collector_stats.overlay():
+                out(f"   {line}")
+            out("")
+        
+        out("=" * 80)
+        out(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} | Press Ctrl+C to exit")
+        
+        self.renderer.render(lines)
     
     def export_report(self, filename=None):
         """Export system report to JSON file"""
         if filename is None:
             filename = self.log_dir / f"system-report-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
         
-        info = self.get_system_info()
+        info = self.get_system_info(cpu_interval=1.0)
         info['security'] = self.check_security_status()
         
         with open(filename, 'w') as f:
@@ -255,11 +547,48 @@ class SentinelXMonitor:
         print(f"Report exported to: {filename}")
         return filename
 
+def export_snapshot(filename=None):
+    """Export the running daemon's snapshot; returns None without a daemon"""
+    snapshot = SnapshotFile.read(SNAPSHOT_FILE, max_age=SNAPSHOT_MAX_AGE)
+    if snapshot is None:
+        return None
+    if filename is None:
+        filename = REPORT_DIR / f"system-report-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    
+    REPORT_DIR.mkdir(parents=True, exist_ok=True)
+    with open(filename, 'w') as f:
+        json.dump(snapshot[0], f, indent=2)
+    
+    print(f"Report exported to: {filename}")
+    return filename
+
 def main():
-    monitor = SentinelXMonitor()
+    parser = argparse.ArgumentParser(description='SentinelX OS system monitor')
+    parser.add_argument('--export', action='store_true',
+                        help='Write a JSON system report and exit')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Run headless and serve metrics over HTTP')
+    parser.add_argument('--listen', default=f'127.0.0.1:{DEFAULT_METRICS_PORT}',
+                        help='HOST:PORT for the metrics endpoint (with --daemon)')
+    parser.add_argument('--self-stats', action='store_true',
+                        help='Show what each collector costs on the dashboard')
+    parser.add_argument('--trace-alloc', action='store_true',
+                        help='Attribute memory allocations to collectors (slower)')
+    args = parser.parse_args()
+    
+    if args.export:
+        # Answer from a running daemon before paying for a live collection
+        if export_snapshot() is None:
+            SentinelXMonitor().export_report()
+        return
+    
+    monitor = SentinelXMonitor(self_stats=args.self_stats, trace_alloc=args.trace_alloc)
     
-    if len(sys.argv) > 1 and sys.argv[1] == '--export':
-        monitor.export_report()
+    if args.daemon:
+        try:
+            monitor.run_daemon(*parse_listen(args.listen))
+        except KeyboardInterrupt:
+            sys.exit(0)
     else:
         try:
             monitor.display_dashboard()
@@ -0,0 +1,959 @@
+"""
+SentinelX OS - Shared monitor components
+
+Collectors, renderers and the metrics/snapshot plumbing used by
+sx-monitor, tools/python/sx-monitor.py and sx-health-monitor. It is
+installed to /usr/lib/sentinelx, where the scripts import it from unless
+SX_LIB_DIR points elsewhere.
+"""
+
+import os
+import re
+import sys
+import time
+import queue
+import select
+import heapq
+import bisect
+import shutil
+import socket
+import mmap
+import struct
+import importlib
+import json
+import threading
+import unicodedata
+import tracemalloc
+from concurrent.futures import Future, wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+class _LazyModule:
+    """Module proxy that imports on first attribute access
+
+    One-shot commands answered from a daemon snapshot never touch psutil
+    (or asyncio), so they skip the import cost entirely.
+    """
+    
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+    
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+psutil = _LazyModule("psutil")
+
+DEFAULT_METRICS_PORT = 9469
+
+def parse_listen(value):
+    """Parse HOST:PORT (or just PORT) for the metrics endpoint"""
+    host, _, port = value.rpartition(':')
+    return host or "127.0.0.1", int(port)
+
+class MetricsServer:
+    """Serve a pre-rendered text exposition over HTTP
+
+    The collection loop publishes a fresh buffer after each tick and
+    scrapes are answered from the last published buffer, so a scrape
+    never triggers a collection.
+    """
+    
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+    
+    def __init__(self, host="127.0.0.1", port=DEFAULT_METRICS_PORT):
+        self._body = b""
+        owner = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = owner._body
+                self.send_response(200)
+                self.send_header("Content-Type", owner.CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def address(self):
+        """(host, port) actually bound; useful when started on port 0"""
+        return self.httpd.server_address[:2]
+    
+    def publish(self, body):
+        """Swap in a newly rendered exposition"""
+        self._body = body.encode() if isinstance(body, str) else body
+    
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        name="sx-metrics", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class MetricsWriter:
+    """Accumulates metric families in the text exposition format"""
+    
+    def __init__(self):
+        self.lines = []
+    
+    @staticmethod
+    def _escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    
+    def family(self, name, kind, help_text, samples):
+        """Add a family; samples is an iterable of (labels dict, value)"""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            if labels:
+                rendered = ",".join(f'{k}="{self._escape(v)}"' for k, v in labels.items())
+                self.lines.append(f"{name}{{{rendered}}} {value}")
+            else:
+                self.lines.append(f"{name} {value}")
+    
+    def histogram(self, name, help_text, series):
+        """Add a histogram; series holds (labels, [(le, cumulative)], sum, count)"""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for labels, buckets, total, count in series:
+            rendered = ",".join(f'{k}="{self._escape(v)}"' for k, v in labels.items())
+            suffix = f"{{{rendered}}}" if rendered else ""
+            for le, cumulative in buckets:
+                self.lines.append(f'{name}_bucket{{{rendered + "," if rendered else ""}le="{le}"}} {cumulative}')
+            self.lines.append(f"{name}_sum{suffix} {total}")
+            self.lines.append(f"{name}_count{suffix} {count}")
+    
+    def render(self):
+        return "\n".join(self.lines) + "\n"
+
+class TerminalRenderer:
+    """Flicker-free differential frame renderer
+
+    A frame is a list of lines. Only lines that changed since the previous
+    frame are redrawn, using cursor positioning, and the whole update goes
+    out in a single write() instead of clearing the screen. Lines are cut
+    to the terminal width and the frame to its height first: a wrapped
+    line or a scrolled screen would shift every row the diff addresses.
+    """
+    
+    TOKEN = re.compile(r'(\033\[[0-9;?]*[A-Za-z])|(.)', re.S)
+    
+    def __init__(self, fd=None):
+        self.fd = fd
+        self._previous = None
+        self._size = None
+    
+    @staticmethod
+    def _width(char):
+        """Terminal columns taken by one character"""
+        if unicodedata.combining(char) or char in '\u200d\ufe0f':
+            return 0
+        return 2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1
+    
+    @classmethod
+    def fit(cls, line, width):
+        """Cut a line to `width` columns, keeping escape sequences intact"""
+        if len(line) <= width and line.isascii():
+            return line
+        pieces = []
+        columns = 0
+        for token in cls.TOKEN.finditer(line):
+            escape, char = token.groups()
+            if escape:
+                pieces.append(escape)
+                continue
+            columns += cls._width(char)
+            if columns > width:
+                # Colours opened before the cut must not bleed into \033[K
+                pieces.append("\033[0m")
+                return "".join(pieces)
+            pieces.append(char)
+        return line
+    
+    def render(self, lines):
+        """Draw a frame, emitting only the lines that differ"""
+        fd = sys.stdout.fileno() if self.fd is None else self.fd
+        size = shutil.get_terminal_size()
+        # Keep the last row free for the parked cursor
+        lines = [self.fit(line, size.columns) for line in lines[:max(1, size.lines - 1)]]
+        out = []
+        previous = self._previous
+        if previous is None or size != self._size:
+            # First frame or terminal resized: repaint everything
+            out.append("\033[?25l\033[H\033[2J")
+            previous = []
+            self._size = size
+        
+        for row, line in enumerate(lines):
+            if row >= len(previous) or previous[row] != line:
+                out.append(f"\033[{row + 1};1H{line}\033[K")
+        for row in range(len(lines), len(previous)):
+            out.append(f"\033[{row + 1};1H\033[K")
+        out.append(f"\033[{len(lines) + 1};1H")
+        
+        data = memoryview("".join(out).encode())
+        while data:
+            data = data[os.write(fd, data):]
+        self._previous = list(lines)
+    
+    def close(self):
+        """Restore the cursor"""
+        if self._previous is not None:
+            fd = sys.stdout.fileno() if self.fd is None else self.fd
+            os.write(fd, b"\033[?25h")
+            self._previous = None
+
+class ProcessCache:
+    """PID-keyed process table cached across ticks
+
+    Each tick costs one read of /proc/<pid>/stat per process. The command
+    name is only decoded for PIDs that are new (or were reused, detected
+    through the start time), and CPU usage is the delta of utime+stime
+    against the previous tick, so even the first refresh after a process
+    appears yields real values on the next tick instead of 0.0.
+    """
+    
+    def __init__(self, proc_root="/proc"):
+        self.proc_root = proc_root
+        self._entries = {}
+        self._last_refresh = None
+        self._clock_ticks = os.sysconf('SC_CLK_TCK')
+        self._page_size = os.sysconf('SC_PAGE_SIZE')
+        self._mem_total = os.sysconf('SC_PHYS_PAGES') * self._page_size
+        self.samples = []
+    
+    def _pids(self):
+        return [int(name) for name in os.listdir(self.proc_root) if name.isdigit()]
+    
+    def refresh(self):
+        """Update the cache and return the number of live processes"""
+        now = time.monotonic()
+        elapsed = now - self._last_refresh if self._last_refresh else 0
+        self._last_refresh = now
+        cpu_scale = 100.0 / (self._clock_ticks * elapsed) if elapsed > 0 else 0.0
+        mem_scale = self._page_size / self._mem_total * 100
+        
+        entries = self._entries
+        current = {}
+        samples = []
+        for pid in self._pids():
+            try:
+                with open(f"{self.proc_root}/{pid}/stat", 'rb') as f:
+                    data = f.read()
+            except OSError:
+                continue  # exited between listdir and open
+            
+            rparen = data.rfind(b')')
+            fields = data[rparen + 2:].split()
+            ticks = int(fields[11]) + int(fields[12])
+            start = fields[19]
+            
+            entry = entries.get(pid)
+            if entry is None or entry[0] != start:
+                name = data[data.find(b'(') + 1:rparen].decode(errors='replace')
+                cpu = 0.0
+            else:
+                name = entry[2]
+                cpu = (ticks - entry[1]) * cpu_scale
+            current[pid] = (start, ticks, name)
+            samples.append({
+                'pid': pid,
+                'name': name,
+                'cpu_percent': cpu,
+                'memory_percent': int(fields[21]) * mem_scale
+            })
+        
+        self._entries = current
+        self.samples = samples
+        return len(samples)
+    
+    def top(self, key, count):
+        """Return the top `count` samples by `key` without a full sort"""
+        return heapq.nlargest(count, self.samples, key=lambda p: p[key] or 0)
+
+class DiskInventory:
+    """Cached mount table with bounded filesystem usage probes
+
+    The mount table is parsed from /proc/self/mountinfo only when the kernel
+    signals a change through poll() (POLLPRI/POLLERR on the open file).
+    Mounts are deduplicated by device, so bind mounts count once. Pseudo
+    filesystems and loop/snap images are skipped by filesystem type, so
+    sources that are not /dev paths (ZFS datasets, btrfs subvolumes,
+    overlay roots, network shares) are still reported. statvfs() runs on daemon worker threads
+    with a per-mount timeout. A hung network mount is reported with its
+    last known usage marked stale instead of blocking the caller, and it
+    is not probed again until the outstanding call returns. Workers stuck
+    in such calls are replaced, up to one per mount, so the other mounts
+    keep getting fresh probes.
+    """
+    
+    # Kernel and runtime pseudo filesystems, plus read-only images that are
+    # always full
+    SKIP_FSTYPES = {
+        'proc', 'sysfs', 'devtmpfs', 'devpts', 'tmpfs', 'ramfs', 'cgroup', 'cgroup2',
+        'securityfs', 'pstore', 'efivarfs', 'bpf', 'debugfs', 'tracefs', 'configfs',
+        'fusectl', 'mqueue', 'hugetlbfs', 'autofs', 'binfmt_misc', 'rpc_pipefs',
+        'nsfs', 'selinuxfs', 'fuse.gvfsd-fuse', 'fuse.portal', 'squashfs', 'iso9660'
+    }
+    
+    def __init__(self, mountinfo="/proc/self/mountinfo", timeout=2.0, workers=4):
+        self.mountinfo_path = mountinfo
+        self.timeout = timeout
+        self._file = None
+        self._poller = None
+        self._mounts = None
+        self._pending = {}
+        self._usage = {}
+        self._last_io = None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = workers
+        self._threads = 0
+        self._inflight = 0  # probes queued or running, hung ones included
+    
+    def _worker(self):
+        while True:
+            future, path = self._queue.get()
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(os.statvfs(path))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._inflight -= 1
+    
+    def _submit(self, path, limit):
+        """Queue a statvfs probe, adding a worker if every one is taken"""
+        future = Future()
+        with self._lock:
+            self._inflight += 1
+            # Each probe occupies at most one worker, so as long as there
+            # are more workers than probes in flight, one of them is free
+            if self._inflight > self._threads and self._threads < limit:
+                threading.Thread(target=self._worker, name=f"sx-statvfs-{self._threads}",
+                                 daemon=True).start()
+                self._threads += 1
+        self._queue.put((future, path))
+        return future
+    
+    @staticmethod
+    def _unescape(value):
+        """Decode the octal escapes (\\040 etc.) used in mountinfo"""
+        return re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), value)
+    
+    def _parse(self, data):
+        by_device = {}
+        for line in data.decode(errors='replace').splitlines():
+            fields = line.split()
+            try:
+                sep = fields.index('-')
+                dev, root, mountpoint = fields[2], fields[3], self._unescape(fields[4])
+                fstype, source = fields[sep + 1], self._unescape(fields[sep + 2])
+            except (ValueError, IndexError):
+                continue
+            if fstype in self.SKIP_FSTYPES or source.startswith('/dev/loop'):
+                continue
+            # Prefer the mount of the filesystem root over bind mounts of subtrees
+            current = by_device.get(dev)
+            if current is None or (root == '/' and current['root'] != '/'):
+                by_device[dev] = {
+                    'mountpoint': mountpoint,
+                    'device': source,
+                    'fstype': fstype,
+                    'root': root,
+                    # Block device name for io_rates(); None for datasets and shares
+                    'disk': (os.path.basename(os.path.realpath(source))
+                             if source.startswith('/dev/') else None)
+                }
+        return list(by_device.values())
+    
+    def invalidate(self):
+        """Force the mount table to be re-read on the next call"""
+        self._mounts = None
+    
+    def mounts(self):
+        """Return the deduplicated mount table, re-parsing only on change"""
+        if self._file is None:
+            self._file = open(self.mountinfo_path, 'rb')
+            self._poller = select.poll()
+            self._poller.register(self._file.fileno(), select.POLLPRI | select.POLLERR)
+        if self._mounts is None or self._poller.poll(0):
+            self._file.seek(0)
+            self._mounts = self._parse(self._file.read())
+            live = {m['mountpoint'] for m in self._mounts}
+            for cache in (self._usage, self._pending):
+                for mountpoint in list(cache):
+                    if mountpoint not in live:
+                        del cache[mountpoint]
+        return self._mounts
+    
+    def _harvest(self, path):
+        """Fold a finished statvfs probe into the usage cache"""
+        future = self._pending.pop(path)
+        try:
+            st = future.result()
+        except OSError:
+            self._usage.pop(path, None)
+            return
+        total = st.f_blocks * st.f_frsize
+        free = st.f_bavail * st.f_frsize
+        used = (st.f_blocks - st.f_bfree) * st.f_frsize
+        self._usage[path] = {
+            'total': total,
+            'used': used,
+            'free': free,
+            'percent': round(used / (used + free) * 100, 1) if used + free else 0.0
+        }
+    
+    def usage(self):
+        """Return {mountpoint: mount info + usage}, waiting at most `timeout`"""
+        mounts = self.mounts()
+        limit = max(self._workers, len(mounts))
+        submitted = []
+        for mount in mounts:
+            path = mount['mountpoint']
+            pending = self._pending.get(path)
+            if pending is not None:
+                if not pending.done():
+                    continue  # previous probe still hung; don't pile up threads
+                self._harvest(path)
+            future = self._submit(path, limit)
+            self._pending[path] = future
+            submitted.append(future)
+        if submitted:
+            wait(submitted, timeout=self.timeout)
+        
+        results = {}
+        for mount in mounts:
+            path = mount['mountpoint']
+            stale = not self._pending[path].done()
+            if not stale:
+                self._harvest(path)
+            if path in self._usage:
+                results[path] = dict(mount, stale=stale, **self._usage[path])
+        return results
+    
+    def io_rates(self):
+        """Return per-device I/O rates from disk_io_counters deltas"""
+        counters = psutil.disk_io_counters(perdisk=True) or {}
+        now = time.monotonic()
+        rates = {}
+        if self._last_io:
+            last_time, last = self._last_io
+            elapsed = now - last_time
+            for name, io in counters.items():
+                prev = last.get(name)
+                if prev is None or elapsed <= 0:
+                    continue
+                rates[name] = {
+                    'read_bytes_per_sec': max(0, io.read_bytes - prev.read_bytes) / elapsed,
+                    'write_bytes_per_sec': max(0, io.write_bytes - prev.write_bytes) / elapsed,
+                    'read_iops': max(0, io.read_count - prev.read_count) / elapsed,
+                    'write_iops': max(0, io.write_count - prev.write_count) / elapsed
+                }
+        self._last_io = (now, counters)
+        return rates
+
+class NetDevSampler:
+    """Per-interface counters and rates from a single /proc/net/dev read
+
+    Each sample() parses the whole file once and keeps the counters, so
+    rates for every interface come from the delta against the previous
+    tick rather than from one call per interface.
+    """
+    
+    # Column offsets after the interface name: RX bytes packets errs drop
+    # fifo frame compressed multicast, then TX bytes packets errs drop ...
+    FIELDS = (('rx_bytes', 0), ('rx_packets', 1), ('rx_errors', 2), ('rx_drops', 3),
+              ('tx_bytes', 8), ('tx_packets', 9), ('tx_errors', 10), ('tx_drops', 11))
+    
+    def __init__(self, dev_path="/proc/net/dev"):
+        self.dev_path = dev_path
+        self._previous = None
+    
+    def _read_counters(self):
+        counters = {}
+        with open(self.dev_path, 'rb') as f:
+            for line in f.readlines()[2:]:
+                name, _, values = line.partition(b':')
+                counters[name.strip().decode()] = [int(v) for v in values.split()]
+        return counters
+    
+    def sample(self):
+        """Return ({iface: {field: total}}, {iface: {field: per second}})"""
+        now = time.monotonic()
+        try:
+            current = self._read_counters()
+        except OSError:
+            return {}, {}
+        previous = self._previous
+        self._previous = (now, current)
+        
+        totals, rates = {}, {}
+        for iface, values in current.items():
+            totals[iface] = {field: values[i] for field, i in self.FIELDS}
+            if previous is None or iface not in previous[1] or now <= previous[0]:
+                continue
+            elapsed = now - previous[0]
+            prev = previous[1][iface]
+            rates[iface] = {field: self._delta(prev[i], values[i]) / elapsed
+                            for field, i in self.FIELDS}
+        return totals, rates
+    
+    @staticmethod
+    def _delta(prev, value):
+        """Counter increase, allowing for 32-bit wraps and resets"""
+        if value >= prev:
+            return value - prev
+        # Drivers with 32-bit counters wrap from near 2**32 back to zero;
+        # any other decrease is an interface being recreated
+        if 2**31 <= prev < 2**32:
+            return value + 2**32 - prev
+        return 0
+
+class ConnectionSummary:
+    """Socket counts without enumerating sockets in Python
+
+    Per-protocol totals come from /proc/net/sockstat and sockstat6 at a
+    constant cost. The TCP state breakdown uses a NETLINK_SOCK_DIAG dump
+    and only tallies the state byte of each reply, falling back to the
+    state column of /proc/net/tcp{,6} when netlink is unavailable.
+    """
+    
+    TCP_STATES = ('', 'ESTABLISHED', 'SYN_SENT', 'SYN_RECV', 'FIN_WAIT1',
+                  'FIN_WAIT2', 'TIME_WAIT', 'CLOSE', 'CLOSE_WAIT', 'LAST_ACK',
+                  'LISTEN', 'CLOSING', 'NEW_SYN_RECV')
+    NETLINK_SOCK_DIAG = 4
+    SOCK_DIAG_BY_FAMILY = 20
+    NLM_F_REQUEST_DUMP = 0x301
+    NLMSG_ERROR = 2
+    NLMSG_DONE = 3
+    
+    def __init__(self, proc_net="/proc/net"):
+        self.proc_net = proc_net
+    
+    def protocols(self):
+        """Return {'TCP': {'inuse': n, 'tw': n, ...}, 'UDP6': {...}, ...}"""
+        counts = {}
+        for name in ('sockstat', 'sockstat6'):
+            try:
+                with open(f"{self.proc_net}/{name}") as f:
+                    for line in f:
+                        proto, _, rest = line.partition(':')
+                        fields = rest.split()
+                        counts[proto.strip()] = dict(zip(fields[::2], map(int, fields[1::2])))
+            except OSError:
+                continue
+        return counts
+    
+    def _diag_states(self, family, counts):
+        request = struct.pack('=LHHLL', 72, self.SOCK_DIAG_BY_FAMILY,
+                              self.NLM_F_REQUEST_DUMP, 1, 0)
+        request += struct.pack('=BBBBL', family, socket.IPPROTO_TCP, 0, 0, 0xFFFFFFFF)
+        request += bytes(48)  # inet_diag_sockid: match every socket
+        with socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM,
+                           self.NETLINK_SOCK_DIAG) as sock:
+            sock.send(request)
+            while True:
+                data = sock.recv(1 << 17)
+                offset = 0
+                while offset + 18 <= len(data):
+                    length, msg_type = struct.unpack_from('=LH', data, offset)
+                    if msg_type == self.NLMSG_DONE:
+                        return
+                    if msg_type == self.NLMSG_ERROR or length < 16:
+                        raise OSError("sock_diag dump failed")
+                    # inet_diag_msg follows the 16-byte header; byte 1 is the state
+                    counts[data[offset + 17]] += 1
+                    offset += (length + 3) & ~3
+    
+    def _proc_states(self, counts):
+        for name in ('tcp', 'tcp6'):
+            try:
+                with open(f"{self.proc_net}/{name}", 'rb') as f:
+                    next(f, None)
+                    for line in f:
+                        counts[int(line.split(None, 4)[3], 16)] += 1
+            except OSError:
+                continue
+    
+    def tcp_states(self):
+        """Return {state name: count} for all TCP sockets"""
+        counts = [0] * 256
+        try:
+            self._diag_states(socket.AF_INET, counts)
+            self._diag_states(socket.AF_INET6, counts)
+        except OSError:
+            counts = [0] * 256
+            self._proc_states(counts)
+        return {self.TCP_STATES[state] if state < len(self.TCP_STATES) else str(state): count
+                for state, count in enumerate(counts) if count}
+    
+    def collect(self, states=True):
+        """Return connection totals by protocol, optionally by TCP state"""
+        protos = self.protocols()
+        inuse = lambda proto: protos.get(proto, {}).get('inuse', 0)
+        summary = {
+            'tcp': inuse('TCP') + inuse('TCP6'),
+            'tcp_time_wait': protos.get('TCP', {}).get('tw', 0),
+            'tcp_orphan': protos.get('TCP', {}).get('orphan', 0),
+            'udp': inuse('UDP') + inuse('UDP6') + inuse('UDPLITE') + inuse('UDPLITE6'),
+            'raw': inuse('RAW') + inuse('RAW6'),
+            'sockets_used': protos.get('sockets', {}).get('used', 0)
+        }
+        summary['total'] = summary['tcp'] + summary['tcp_time_wait'] + summary['udp']
+        if states:
+            summary['tcp_states'] = self.tcp_states()
+        return summary
+
+class CgroupAccounting:
+    """Per-unit resource usage from cgroup v2 accounting files
+
+    Walks the cgroup tree for systemd units (services and scopes, which
+    includes containers) and reads cpu.stat, memory.current and io.stat of
+    each. The kernel accounts a unit's whole subtree in its own files, so
+    the walk stops at a unit and a tick costs O(cgroups) reads, however
+    many processes they hold. CPU and I/O rates are deltas against the
+    previous sample.
+    """
+    
+    UNIT_SUFFIXES = ('.service', '.scope')
+    
+    def __init__(self, cgroup_root="/sys/fs/cgroup"):
+        self.cgroup_root = cgroup_root
+        self._previous = None
+        self.samples = []
+        # Only the unified (v2) hierarchy has cgroup.controllers at its root
+        self.available = os.path.exists(os.path.join(cgroup_root, 'cgroup.controllers'))
+    
+    def _units(self, path, relative=""):
+        """Yield (cgroup path relative to the root, absolute path) per unit"""
+        try:
+            entries = [entry for entry in os.scandir(path) if entry.is_dir(follow_symlinks=False)]
+        except OSError:
+            return
+        for entry in entries:
+            name = f"{relative}/{entry.name}" if relative else entry.name
+            if entry.name.endswith(self.UNIT_SUFFIXES):
+                yield name, entry.path
+            else:
+                yield from self._units(entry.path, name)
+    
+    @staticmethod
+    def _read_unit(path):
+        """Return (cpu usage usec, memory bytes, io read bytes, io write bytes)"""
+        usage = 0
+        with open(f"{path}/cpu.stat", 'rb') as f:
+            for line in f:
+                if line.startswith(b'usage_usec '):
+                    usage = int(line.split()[1])
+                    break
+        # memory.current and io.stat exist only where the controller is enabled
+        try:
+            with open(f"{path}/memory.current", 'rb') as f:
+                memory = int(f.read())
+        except (OSError, ValueError):
+            memory = 0
+        read_bytes = write_bytes = 0
+        try:
+            with open(f"{path}/io.stat", 'rb') as f:
+                # One line per device: "8:0 rbytes=.. wbytes=.. rios=.. ..."
+                for line in f:
+                    for item in line.split()[1:]:
+                        key, _, value = item.partition(b'=')
+                        if key == b'rbytes':
+                            read_bytes += int(value)
+                        elif key == b'wbytes':
+                            write_bytes += int(value)
+        except OSError:
+            pass
+        return usage, memory, read_bytes, write_bytes
+    
+    def sample(self):
+        """Return one usage dict per unit; rates need a previous sample"""
+        if not self.available:
+            return []
+        now = time.monotonic()
+        previous = self._previous
+        current = {}
+        samples = []
+        for cgroup, path in self._units(self.cgroup_root):
+            try:
+                usage, memory, read_bytes, write_bytes = self._read_unit(path)
+            except (OSError, ValueError):
+                continue  # unit stopped during the walk
+            current[cgroup] = (usage, read_bytes, write_bytes)
+            sample = {
+                'unit': cgroup.rsplit('/', 1)[-1],
+                'cgroup': cgroup,
+                'cpu_percent': 0.0,
+                'memory_bytes': memory,
+                'io_read_bytes_per_sec': 0.0,
+                'io_write_bytes_per_sec': 0.0
+            }
+            if previous is not None and cgroup in previous[1] and now > previous[0]:
+                elapsed = now - previous[0]
+                prev = previous[1][cgroup]
+                # Counters restart when a unit is recreated; clamp to zero
+                sample['cpu_percent'] = max(0, usage - prev[0]) / (elapsed * 1e6) * 100
+                sample['io_read_bytes_per_sec'] = max(0, read_bytes - prev[1]) / elapsed
+                sample['io_write_bytes_per_sec'] = max(0, write_bytes - prev[2]) / elapsed
+            samples.append(sample)
+        self._previous = (now, current)
+        self.samples = samples
+        return samples
+    
+    def top(self, key, count):
+        """Return the top `count` units by `key` without a full sort"""
+        return heapq.nlargest(count, self.samples, key=lambda u: u[key])
+
+class SnapshotFile:
+    """Latest daemon snapshot in a memory-mapped file, guarded by a seqlock
+
+    A fixed header (magic, format version, writer PID, sequence number,
+    publish time, payload length) is followed by a JSON payload. The writer
+    makes the sequence odd, rewrites payload and header, then makes it even
+    again. A reader copies the payload between two reads of the sequence
+    and retries while it is odd or has changed, so neither side locks and
+    readers never hold up the daemon.
+    """
+    
+    MAGIC = b'SXSNAP\0\0'
+    VERSION = 1
+    HEADER = struct.Struct('=8sIIQdQ')  # magic, version, pid, seq, updated, length
+    SEQ = struct.Struct('=Q')
+    SEQ_OFFSET = 16
+    
+    def __init__(self, path, capacity=256 * 1024):
+        self.path = Path(path)
+        self.capacity = capacity
+        self._map = None
+        self._seq = 0
+    
+    def _create(self, capacity):
+        """Create a fresh mapping and move it into place atomically"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}")
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, self.HEADER.size + capacity)
+            mapping = mmap.mmap(fd, self.HEADER.size + capacity)
+        finally:
+            os.close(fd)
+        self.HEADER.pack_into(mapping, 0, self.MAGIC, self.VERSION, os.getpid(), self._seq, 0.0, 0)
+        os.replace(tmp_path, self.path)
+        if self._map is not None:
+            self._map.close()
+        self._map = mapping
+        self.capacity = capacity
+    
+    def publish(self, data):
+        """Replace the snapshot with `data` (anything JSON-serialisable)"""
+        payload = json.dumps(data, default=str).encode()
+        if self._map is None or len(payload) > self.capacity:
+            capacity = self.capacity
+            while capacity < len(payload):
+                capacity *= 2
+            self._create(capacity)
+        
+        mapping = self._map
+        self._seq += 1  # odd: update in progress
+        self.SEQ.pack_into(mapping, self.SEQ_OFFSET, self._seq)
+        mapping[self.HEADER.size:self.HEADER.size + len(payload)] = payload
+        self.HEADER.pack_into(mapping, 0, self.MAGIC, self.VERSION, os.getpid(),
+                              self._seq, time.time(), len(payload))
+        self._seq += 1  # even: consistent again
+        self.SEQ.pack_into(mapping, self.SEQ_OFFSET, self._seq)
+    
+    def close(self):
+        """Withdraw the snapshot so readers fall back to live collection"""
+        if self._map is None:
+            return
+        self._map.close()
+        self._map = None
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+    
+    @staticmethod
+    def _alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+    
+    @classmethod
+    def read(cls, path, max_age=None, retries=100):
+        """Return (data, publish time) from a live writer, else None"""
+        try:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+                for _ in range(retries):
+                    magic, version, pid, seq, updated, length = cls.HEADER.unpack_from(mapping, 0)
+                    if magic != cls.MAGIC or version != cls.VERSION:
+                        return None
+                    if seq & 1:
+                        time.sleep(0.0001)
+                        continue
+                    payload = mapping[cls.HEADER.size:cls.HEADER.size + length]
+                    if cls.SEQ.unpack_from(mapping, cls.SEQ_OFFSET)[0] == seq:
+                        break
+                else:
+                    return None
+        except (OSError, ValueError, struct.error):
+            return None
+        
+        if not cls._alive(pid) or (max_age is not None and time.time() - updated > max_age):
+            return None
+        try:
+            return json.loads(payload), updated
+        except ValueError:
+            return None
+
+class CollectorStats:
+    """Per-collector cost accounting for the monitor itself
+
+    Every collector call lands in a fixed set of log-spaced duration
+    buckets, so recording is O(1) and the data exports as a histogram
+    unchanged. With trace_memory, tracemalloc also attributes the net and
+    peak allocation of each collector's last run. Its counters are
+    process-wide, so traced calls are serialised: concurrent collectors
+    take turns instead of overlapping, which slows collection down and is
+    why tracing is off unless asked for.
+    """
+    
+    BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+               0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.collectors = {}
+        self._lock = threading.Lock()
+        self._trace_lock = threading.Lock()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+    
+    def measure(self, name, func, *args):
+        """Call func(*args), recording its duration (and allocations)"""
+        if not self.trace_memory:
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self.record(name, time.perf_counter() - started)
+        with self._trace_lock:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                elapsed = time.perf_counter() - started
+                current, peak = tracemalloc.get_traced_memory()
+                self.record(name, elapsed, current - before, peak - before)
+    
+    def record(self, name, seconds, allocated=None, peak=None):
+        with self._lock:
+            entry = self.collectors.get(name)
+            if entry is None:
+                entry = self.collectors[name] = {
+                    'buckets': [0] * (len(self.BUCKETS) + 1),
+                    'count': 0, 'sum': 0.0, 'max': 0.0, 'last': 0.0,
+                    'allocated': 0, 'peak': 0
+                }
+            entry['buckets'][bisect.bisect_left(self.BUCKETS, seconds)] += 1
+            entry['count'] += 1
+            entry['sum'] += seconds
+            entry['last'] = seconds
+            entry['max'] = max(entry['max'], seconds)
+            if allocated is not None:
+                entry['allocated'] = allocated
+                entry['peak'] = max(0, peak)
+    
+    def snapshot(self):
+        """Return a consistent copy of every collector's entry"""
+        with self._lock:
+            return {name: dict(entry, buckets=list(entry['buckets']))
+                    for name, entry in self.collectors.items()}
+    
+    def quantile(self, entry, q):
+        """Upper bound of the bucket holding the q-quantile, capped at max"""
+        rank = q * entry['count']
+        seen = 0
+        for bound, count in zip(self.BUCKETS, entry['buckets']):
+            seen += count
+            if seen >= rank:
+                return min(bound, entry['max'])
+        return entry['max']
+    
+    @staticmethod
+    def process_usage():
+        """Return (CPU seconds, resident bytes) of this process"""
+        times = os.times()
+        try:
+            with open('/proc/self/statm', 'rb') as f:
+                resident = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            resident = 0
+        return times.user + times.system, resident
+    
+    def render(self, writer):
+        """Add the monitor overhead families to a MetricsWriter"""
+        collectors = self.snapshot()
+        series = []
+        for name, entry in collectors.items():
+            cumulative = 0
+            buckets = []
+            for bound, count in zip(self.BUCKETS, entry['buckets']):
+                cumulative += count
+                buckets.append((bound, cumulative))
+            buckets.append(('+Inf', entry['count']))
+            series.append(({'collector': name}, buckets, entry['sum'], entry['count']))
+        writer.histogram("sx_monitor_collector_duration_seconds",
+                         "Time spent in each collector", series)
+        if self.trace_memory:
+            writer.family("sx_monitor_collector_allocated_bytes", "gauge",
+                          "Net memory allocated by the last run of each collector",
+                          [({'collector': name}, e['allocated']) for name, e in collectors.items()])
+            writer.family("sx_monitor_collector_peak_bytes", "gauge",
+                          "Peak memory allocated during the last run of each collector",
+                          [({'collector': name}, e['peak']) for name, e in collectors.items()])
+        cpu_seconds, resident = self.process_usage()
+        writer.family("sx_monitor_cpu_seconds_total", "counter",
+                      "CPU time used by the monitor process", [({}, f"{cpu_seconds:.2f}")])
+        writer.family("sx_monitor_resident_memory_bytes", "gauge",
+                      "Resident memory of the monitor process", [({}, resident)])
+    
+    def overlay(self):
+        """Dashboard lines summarising what each collector costs"""
+        lines = []
+        for name, entry in sorted(self.snapshot().items()):
+            mean = entry['sum'] / entry['count']
+            alloc = ""
+            if self.trace_memory:
+                alloc = f" | alloc {entry['allocated'] / 1024:+.0f} KB peak {entry['peak'] / 1024:.0f} KB"
+            lines.append(f"{name:<12} last {entry['last'] * 1000:7.2f} ms | mean {mean * 1000:7.2f} ms"
+                         f" | p95 ≤{self.quantile(entry, 0.95) * 1000:7.2f} ms"
+                         f" | max {entry['max'] * 1000:7.2f} ms{alloc}")
+        cpu_seconds, resident = self.process_usage()
+        lines.append(f"process      CPU {cpu_seconds:.1f} s | RSS {resident / 1024**2:.1f} MB")
+        return lines